@@ -0,0 +1,250 @@
+"""Local HTTP server emulating the Deta Base and Drive APIs, for benchmarks.
+
+Storage is delegated to the local backend of flask_deta (`LocalDeta`), and every
+request can be delayed by an injected latency. The number of requests per route is
+exposed at `GET /__stats` and cleared with `POST /__reset`. Downloads honour single
+byte ranges.
+
+    python benchmarks/fake_server.py --port 8765 --latency 0.02
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from flask_deta.local import LocalDeta
+
+_PATH = re.compile(r"^/v1/(?P<project>[^/]+)/(?P<name>[^/]+)(?P<route>/.*)$")
+_ID = re.compile(r"^/(items|uploads)/[^/]+")
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _byte_range(header: str, length: int):
+    """Returns the `[start, stop)` window of a single-range `Range` header, or None."""
+
+    match = _RANGE.match(header or "")
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        return max(length - int(last), 0), length
+    start = int(first)
+    stop = min(int(last) + 1, length) if last else length
+    return (start, stop) if start < stop else (length, length)
+
+
+class FakeDetaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.0, storage: str = ":memory:"):
+        super().__init__(address, FakeDetaHandler)
+        self.latency = latency
+        self.deta = LocalDeta(storage)
+        self.requests = Counter()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, route: str, bytes_in: int, bytes_out: int):
+        with self._lock:
+            self.requests[route] += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": sum(self.requests.values()),
+                "routes": dict(self.requests),
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+            self.bytes_in = self.bytes_out = 0
+
+
+class FakeDetaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; with Nagle's algorithm, delayed ACKs add ~40ms per response.
+    disable_nagle_algorithm = True
+    _route = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status: int, payload=None, content_type="application/json", headers=None):
+        if isinstance(payload, (dict, list)):
+            body = json.dumps(payload).encode()
+        else:
+            body = payload or b""
+        # Counted before the response is written, so a client reading `/__stats` right after it sees it.
+        if self._route is not None:
+            self.server.count(self._route, self._bytes_in, len(body))
+            self._route = None
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method: str):
+        body = self._body()
+        self._route = None
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if url.path == "/__stats":
+            self._send(200, self.server.stats())
+            return
+        if url.path == "/__reset":
+            self.server.reset()
+            self._send(200, {})
+            return
+
+        match = _PATH.match(url.path)
+        if match is None:
+            self._send(404, {"errors": ["Not found"]})
+            return
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        name, route = match["name"], match["route"]
+        self._route = method + " " + _ID.sub(r"/\1/{id}", route)
+        self._bytes_in = len(body)
+        try:
+            self._dispatch(method, name, route, query, body)
+        except Exception as e:
+            self._send(400, {"errors": [str(e)]})
+
+    def _dispatch(self, method, name, route, query, body):
+        data = json.loads(body) if body and self.headers.get("Content-Type") == "application/json" else None
+
+        if route.startswith("/items") or route == "/query":
+            base = self.server.deta.Base(name)
+            key = unquote(route[len("/items/"):]) if route.startswith("/items/") else None
+
+            if method == "GET" and key:
+                item = base.get(key)
+                return self._send(200, item) if item else self._send(404, {"key": key})
+            if method == "PUT" and route == "/items":
+                items = [base.put(item) for item in data["items"]]
+                return self._send(207, {"processed": {"items": items}})
+            if method == "POST" and route == "/items":
+                return self._send(201, base.insert(data["item"]))
+            if method == "PATCH" and key:
+                updates = dict(data.get("set", {}))
+                updates.update({f: base.util.increment(v) for f, v in data.get("increment", {}).items()})
+                updates.update({f: base.util.append(v) for f, v in data.get("append", {}).items()})
+                updates.update({f: base.util.prepend(v) for f, v in data.get("prepend", {}).items()})
+                updates.update({f: base.util.trim() for f in data.get("delete", [])})
+                if base.get(key) is None:
+                    return self._send(404, {"key": key})
+                base.update(updates, key)
+                return self._send(200, {"key": key})
+            if method == "DELETE" and key:
+                base.delete(key)
+                return self._send(200, {"key": key})
+            if method == "POST" and route == "/query":
+                res = base.fetch(data.get("query"), limit=data.get("limit", 1000), last=data.get("last"))
+                paging = {"size": res.count}
+                if res.last:
+                    paging["last"] = res.last
+                return self._send(200, {"paging": paging, "items": res.items})
+
+        drive = self.server.deta.Drive(name)
+        if method == "GET" and route == "/files":
+            return self._send(
+                200,
+                drive.list(int(query.get("limit", 1000)), query.get("prefix"), query.get("last")),
+            )
+        if method == "GET" and route == "/files/download":
+            file = drive.get(query["name"])
+            if file is None:
+                return self._send(404, {"errors": ["Not found"]})
+            try:
+                content, content_type = file.read(), file.getheader("Content-Type") or "application/octet-stream"
+            finally:
+                file.close()
+            window = _byte_range(self.headers.get("Range"), len(content))
+            if window is None:
+                return self._send(200, content, content_type)
+            start, stop = window
+            if start >= len(content):
+                return self._send(416, {"errors": ["Range not satisfiable"]}, headers={"Content-Range": f"bytes */{len(content)}"})
+            content_range = f"bytes {start}-{stop - 1}/{len(content)}"
+            return self._send(206, content[start:stop], content_type, headers={"Content-Range": content_range})
+        if method == "POST" and route == "/files":
+            drive.put(query["name"], body, content_type=self.headers.get("Content-Type"))
+            return self._send(201, {"name": query["name"]})
+        if method == "DELETE" and route == "/files":
+            return self._send(200, drive.delete_many(data["names"]) | {"failed": {}})
+        if route.startswith("/uploads"):
+            parts = route.strip("/").split("/")
+            if method == "POST" and len(parts) == 1:
+                return self._send(202, {"upload_id": drive._start_upload(query["name"]), "name": query["name"]})
+            if method == "POST" and len(parts) == 3:
+                drive._upload_part(query["name"], body, parts[1], int(query["part"]))
+                return self._send(200, {"name": query["name"], "part": int(query["part"])})
+            if method == "PATCH":
+                drive._finish_upload(query["name"], parts[1])
+                return self._send(200, {"name": query["name"]})
+            if method == "DELETE":
+                drive._abort_upload(query["name"], parts[1])
+                return self._send(200, {"name": query["name"]})
+
+        return self._send(404, {"errors": ["Not found"]})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, latency: float = 0.0) -> FakeDetaServer:
+    """Starts a fake server in a background thread and returns it; `port=0` picks a free port."""
+
+    server = FakeDetaServer((host, port), latency=latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    args = parser.parse_args()
+
+    server = FakeDetaServer((args.host, args.port), latency=args.latency)
+    print(f"Fake Deta server listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,332 @@
+"""Benchmarks of the DetaBase and DetaDrive hot paths against a local fake Deta server.
+
+For every method and payload size it reports throughput, p50/p99 latency, HTTP round
+trips per call and peak memory (tracemalloc), as a table and optionally as JSON:
+
+    python benchmarks/run.py --latency 0.005 --iterations 200 --output bench.json
+    python benchmarks/run.py --compare bench.json   # against a previous run
+    python benchmarks/run.py --server http://127.0.0.1:8765   # fake server started separately
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+from urllib.request import Request, urlopen
+
+from flask import Flask
+
+import flask_deta
+from flask_deta import DetaBase, DetaDrive
+
+KB = 1024
+
+
+class RemoteServer:
+    """Fake server started separately (`python benchmarks/fake_server.py`), e.g. from the
+    current tree while an older release of flask_deta, without `flask_deta.local`, is measured.
+    """
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+
+    def reset(self):
+        urlopen(f"{self.url}/__reset", data=b"").read()
+
+    def stats(self) -> dict:
+        with urlopen(f"{self.url}/__stats") as response:
+            return json.load(response)
+
+    def shutdown(self):
+        pass
+
+
+SEED = "__bench_seed"
+
+
+def seed_server(url: str, present: bool):
+    """Stores (or removes) one record and one file in the benchmarked Base and Drive.
+
+    Older releases refuse to start on an empty Base or Drive, so the seed is present while
+    the instances are created.
+    """
+
+    root = f"{url}/v1/bench/bench"
+    headers = {"Content-Type": "application/json"}
+    if present:
+        requests = [
+            Request(f"{root}/items", json.dumps({"items": [{"key": SEED}]}).encode(), headers, method="PUT"),
+            Request(f"{root}/files?name={SEED}", b"seed", method="POST"),
+        ]
+    else:
+        requests = [
+            Request(f"{root}/items/{SEED}", method="DELETE"),
+            Request(f"{root}/files", json.dumps({"names": [SEED]}).encode(), headers, method="DELETE"),
+        ]
+    for request in requests:
+        urlopen(request).read()
+
+
+def plain_http(netloc: str):
+    """Makes `http.client.HTTPSConnection` speak plain HTTP to `netloc` (`host:port`).
+
+    The Deta SDK only opens HTTPS connections to a bare `host[:port]`, while the fake server
+    speaks plain HTTP: patched this way, the SDK of any release can reach it.
+    """
+
+    connect = http.client.HTTPSConnection.connect
+
+    def plain_connect(self):
+        if f"{self.host}:{self.port}" == netloc:
+            return http.client.HTTPConnection.connect(self)
+        return connect(self)
+
+    http.client.HTTPSConnection.connect = plain_connect
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers."""
+
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Scenario:
+    """A benchmarked call: `setup(n)` prepares the data of the next `n` calls, untimed."""
+
+    def __init__(self, name: str, size: int, call, setup=None):
+        self.name = name
+        self.size = size
+        self.call = call
+        self.setup = setup or (lambda ids: None)
+        self._ids = itertools.count()
+
+    def prepare(self, count: int) -> list:
+        ids = [next(self._ids) for _ in range(count)]
+        self.setup(ids)
+        return ids
+
+
+def scenarios(base: DetaBase, drive: DetaDrive, sizes: list, items: int) -> list:
+    def record(i, size):
+        return {"key": f"item-{size}-{i}", "payload": "x" * size}
+
+    def get_all_setup(ids):
+        base.put_all(record(i, 64) for i in range(items))
+
+    def drive_file(prefix, size):
+        return lambda ids: [drive.put_file(f"{prefix}-{size}-{i}", b"x" * size) for i in ids]
+
+    result = []
+    for size in sizes:
+        result += [
+            Scenario(
+                "base.get",
+                size,
+                lambda i, size=size: base.get(f"item-{size}-0"),
+                lambda ids, size=size: base.put(record(0, size)),
+            ),
+            Scenario("base.put", size, lambda i, size=size: base.put(record(i, size))),
+            Scenario(
+                "base.put_all",
+                size,
+                lambda i, size=size: base.put_all(record(f"{i}-{n}", size) for n in range(100)),
+            ),
+            Scenario(
+                "drive.get_file",
+                size,
+                lambda i, size=size: drive.get_file(f"get-{size}-0").read(),
+                lambda ids, size=size: drive.put_file(f"get-{size}-0", b"x" * size),
+            ),
+            Scenario(
+                "drive.put_file",
+                size,
+                lambda i, size=size: drive.put_file(f"put-{size}-{i}", b"x" * size),
+            ),
+            Scenario(
+                "drive.delete_file",
+                size,
+                lambda i, size=size: drive.delete_file(f"delete-{size}-{i}"),
+                drive_file("delete", size),
+            ),
+        ]
+
+    sync_dir = tempfile.mkdtemp(prefix="flask-deta-sync-")
+
+    def sync_setup(ids):
+        if not os.listdir(sync_dir):
+            for n in range(items):
+                with open(os.path.join(sync_dir, f"file-{n}.txt"), "wb") as file:
+                    file.write(b"x" * 64)
+            drive.sync_dir(sync_dir, prefix="sync/")
+
+    def resync(i):
+        # Nothing changed: only the manifest is read. A manifest that was not saved uploads everything again.
+        result = drive.sync_dir(sync_dir, prefix="sync/")
+        if result["uploaded"] or result["failed"]:
+            raise RuntimeError(f"The manifest of the previous sync was not used => {result}")
+
+    result += [
+        Scenario("base.get_all", items, lambda i: base.get_all(), get_all_setup),
+        Scenario(
+            "drive.all_files",
+            items,
+            lambda i: drive.all_files(prefix="list-"),
+            lambda ids: [drive.put_file(f"list-{n}", b"x") for n in range(items)],
+        ),
+        Scenario("drive.sync_dir", items, resync, sync_setup),
+    ]
+    return result
+
+
+def measure(scenario: Scenario, server, iterations: int, warmup: int, memory_iterations: int) -> dict:
+    for i in scenario.prepare(warmup):
+        scenario.call(i)
+
+    ids = scenario.prepare(iterations)
+    if server is not None:
+        server.reset()
+    timings = []
+    started = time.perf_counter()
+    for i in ids:
+        call_started = time.perf_counter()
+        scenario.call(i)
+        timings.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    traffic = server.stats() if server is not None else None
+
+    # Peak memory is measured on a separate, shorter pass: tracemalloc slows every allocation.
+    ids = scenario.prepare(memory_iterations)
+    tracemalloc.start()
+    for i in ids:
+        scenario.call(i)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "method": scenario.name,
+        "size": scenario.size,
+        "iterations": iterations,
+        "throughput": iterations / elapsed,
+        "p50_ms": percentile(timings, 50) * 1000,
+        "p99_ms": percentile(timings, 99) * 1000,
+        "round_trips": traffic["requests"] / iterations if traffic else None,
+        "bytes_per_call": (traffic["bytes_in"] + traffic["bytes_out"]) / iterations if traffic else None,
+        "peak_memory_bytes": peak,
+    }
+
+
+def build_app(args, server) -> tuple[Flask, DetaBase, DetaDrive]:
+    app = Flask(__name__)
+    app.config.update(
+        DETA_PROJECT_KEY="bench_key",
+        BASE_NAME="bench",
+        DRIVE_NAME="bench",
+    )
+    if server is not None and args.transport == "none":
+        # Without DETA_TRANSPORT, each instance uses the single HTTPS connection of the Deta SDK.
+        netloc = urlsplit(server.url).netloc
+        plain_http(netloc)
+        app.config.update(BASE_HOST=netloc, DRIVE_HOST=netloc)
+    elif server is not None:
+        app.config.update(BASE_HOST=server.url, DRIVE_HOST=server.url, DETA_TRANSPORT=args.transport)
+    else:
+        app.config.update(DETA_BACKEND="local", DETA_LOCAL_PATH=tempfile.mkdtemp(prefix="flask-deta-bench-"))
+        return app, DetaBase(app), DetaDrive(app)
+
+    seed_server(server.url, True)
+    try:
+        return app, DetaBase(app), DetaDrive(app)
+    finally:
+        seed_server(server.url, False)
+
+
+def print_table(results: list, baseline: dict):
+    header = f"{'method':<20}{'size':>9}{'ops/s':>11}{'p50 ms':>9}{'p99 ms':>9}{'trips':>7}{'peak KiB':>10}"
+    if baseline:
+        header += f"{'p50 vs base':>13}"
+    print(header)
+    for result in results:
+        trips = "-" if result["round_trips"] is None else f"{result['round_trips']:.2f}"
+        line = (
+            f"{result['method']:<20}{result['size']:>9}{result['throughput']:>11.1f}"
+            f"{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}{trips:>7}"
+            f"{result['peak_memory_bytes'] / KB:>10.1f}"
+        )
+        previous = baseline.get((result["method"], result["size"]))
+        if previous:
+            line += f"{(result['p50_ms'] / previous['p50_ms'] - 1) * 100:>+12.1f}%"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=("http", "local"), default="http",
+                        help="'http' talks to the fake server, 'local' uses the in-process backend")
+    parser.add_argument("--transport", choices=("none", "pooled", "http2"), default="none",
+                        help="'none' measures the default connection of the Deta SDK (DETA_TRANSPORT unset)")
+    parser.add_argument("--server", help="URL of a fake server started separately, instead of an in-process one")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added by the server to every request")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--memory-iterations", type=int, default=10)
+    parser.add_argument("--sizes", default="1024,65536", help="Comma-separated payload sizes, in bytes")
+    parser.add_argument("--items", type=int, default=200, help="Records/files listed by get_all and all_files")
+    parser.add_argument("--only", help="Run only the methods containing this text, e.g. 'drive.'")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON file of a previous run to compare p50 latencies against")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.server:
+        server = RemoteServer(args.server)
+    elif args.backend == "http":
+        from fake_server import start_server
+
+        server = start_server(latency=args.latency)
+    app, base, drive = build_app(args, server)
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    results = []
+    with app.app_context():
+        for scenario in scenarios(base, drive, sizes, args.items):
+            if args.only and args.only not in scenario.name:
+                continue
+            try:
+                results.append(measure(scenario, server, args.iterations, args.warmup, args.memory_iterations))
+            except Exception as e:
+                # Older releases lack some methods, or fail them; the other scenarios still run.
+                print(f"{scenario.name} ({scenario.size}) skipped => {e!r}", file=sys.stderr)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = {(r["method"], r["size"]): r for r in json.load(file)["results"]}
+    print_table(results, baseline)
+
+    if args.output:
+        report = {
+            "flask_deta": flask_deta.__version__,
+            "python": platform.python_version(),
+            "backend": args.backend,
+            "transport": args.transport if server is not None else None,
+            "latency": args.latency,
+            "results": results,
+        }
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
 from .deta_base import DetaBase
 from .deta_drive import DetaDrive
+from .async_deta import AsyncDetaBase, AsyncDetaDrive
 
 __version__ = "0.2.1"
@@ -0,0 +1,109 @@
+from typing import Iterable, Optional
+
+AGGREGATES = ("count", "sum", "min", "max", "avg")
+
+_MISSING = object()
+
+
+def get_path(record: dict, path: str, default=None):
+    """Returns the value of a field of a record, following dotted paths into nested dicts."""
+
+    value = record
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return default
+        value = value.get(part, _MISSING)
+        if value is _MISSING:
+            return default
+    return value
+
+
+def project(record: dict, fields: Iterable[str]) -> dict:
+    """Returns the `key` of a record and the top-level fields needed by the given (dotted) fields."""
+
+    projected = {"key": record.get("key")}
+    for field in fields:
+        top = field.split(".", 1)[0]
+        if top in record:
+            projected[top] = record[top]
+    return projected
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class Aggregate:
+    """## Class Aggregate
+    Incremental fold of the values of a field: `count` (values present), `sum`, `avg`
+    (of numbers), `min` or `max` (of numbers or of strings). Missing and null values
+    are skipped, so memory stays constant whatever the number of values.
+    """
+
+    def __init__(self, func: str):
+        if func not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate '{func}', expected one of {AGGREGATES}")
+        self.func = func
+        self.count = 0
+        self.total = 0
+        self.value = None
+
+    def add(self, value):
+        if value is None:
+            return
+        if self.func == "count":
+            self.count += 1
+        elif self.func in ("sum", "avg"):
+            if _is_number(value):
+                self.count += 1
+                self.total += value
+        elif _is_number(value) or isinstance(value, str):
+            if self.value is None:
+                self.value = value
+            elif _is_number(value) != _is_number(self.value):
+                raise TypeError(f"Can not compare {value!r} with {self.value!r}")
+            elif (value < self.value) if self.func == "min" else (value > self.value):
+                self.value = value
+            self.count += 1
+
+    @property
+    def result(self):
+        if self.func == "count":
+            return self.count
+        if self.func == "sum":
+            return self.total
+        if self.func == "avg":
+            return self.total / self.count if self.count else None
+        return self.value
+
+
+def group_key(value):
+    """Returns a hashable group key for any field value (lists become tuples)."""
+
+    if isinstance(value, list):
+        return tuple(group_key(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, group_key(item)) for key, item in value.items()))
+    return value
+
+
+def fold(records: Iterable[dict], func: str, field: Optional[str] = None):
+    """Folds any number of records into a single aggregate of `field` (or of records, for `count`)."""
+
+    aggregate = Aggregate(func)
+    for record in records:
+        aggregate.add(get_path(record, field) if field else True)
+    return aggregate.result
+
+
+def fold_groups(records: Iterable[dict], by: str, func: str, field: Optional[str] = None) -> dict:
+    """Folds any number of records into one aggregate per value of the `by` field."""
+
+    groups = {}
+    for record in records:
+        key = group_key(get_path(record, by))
+        aggregate = groups.get(key)
+        if aggregate is None:
+            aggregate = groups[key] = Aggregate(func)
+        aggregate.add(get_path(record, field) if field else True)
+    return {key: aggregate.result for key, aggregate in groups.items()}
@@ -0,0 +1,603 @@
+import asyncio
+import io
+import weakref
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Optional, Union
+from urllib.parse import quote
+
+from flask import current_app
+
+from .batching import PUT_MANY_LIMIT, chunked, expiration, run_batches_async
+from .deta_drive import DELETE_MANY_LIMIT
+
+# One aiohttp session (and connection pool) per event loop and project key,
+# shared by every AsyncDetaBase and AsyncDetaDrive of that project.
+_sessions = weakref.WeakKeyDictionary()
+
+# Pending tasks closing the sessions of their loop when it shuts down (strong references).
+_closers = set()
+
+
+def _client_session(project_key: str, limit: int):
+    try:
+        import aiohttp
+    except ImportError:
+        raise ImportError(
+            "AsyncDetaBase and AsyncDetaDrive require aiohttp. "
+            "Install it with: pip install flask-deta[async]"
+        )
+
+    loop = asyncio.get_running_loop()
+    sessions = _sessions.get(loop)
+    if sessions is None:
+        sessions = _sessions[loop] = {}
+        closer = loop.create_task(_close_on_shutdown())
+        _closers.add(closer)
+        closer.add_done_callback(_closers.discard)
+
+    session = sessions.get(project_key)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            headers={"X-API-Key": project_key},
+            connector=aiohttp.TCPConnector(limit=limit),
+        )
+        sessions[project_key] = session
+    return session
+
+
+async def _close_on_shutdown():
+    """Waits until its event loop shuts down, then closes the sessions opened on it.
+
+    `asyncio.run()`, and Flask (through asgiref) after each `async def` view, cancel the
+    pending tasks of a loop before closing it, so its sessions never outlive it.
+    """
+
+    try:
+        await asyncio.get_running_loop().create_future()
+    finally:
+        await close_sessions()
+
+
+async def close_sessions():
+    """Closes the shared HTTP sessions opened on the running event loop.
+
+    They are closed automatically when the loop shuts down, e.g. at the end of each
+    `async def` view; await this to release the connections earlier.
+    """
+
+    sessions = _sessions.pop(asyncio.get_running_loop(), {})
+    for session in sessions.values():
+        await session.close()
+
+
+class _AsyncService:
+    """Non-blocking client for the HTTP API of a Deta Base or Drive."""
+
+    def __init__(self, project_key, name, host, default_host, pool_size):
+        if not project_key:
+            raise KeyError("The project key has not been provided.")
+        if not name:
+            raise ValueError("The name has not been provided")
+
+        host = host or default_host
+        if "://" not in host:
+            host = f"https://{host}"
+        project_id = project_key.split("_")[0]
+
+        self.project_key = project_key
+        self.pool_size = pool_size
+        self.url = f"{host.rstrip('/')}/v1/{project_id}/{name}"
+
+    async def request(
+        self, method, path, json=None, data=None, params=None, content_type=None, raw=False
+    ):
+        """Sends a request and returns `(status, payload)`; the payload is None on 404.
+
+        JSON responses are decoded, unless `raw` is set: then the body is always returned as bytes.
+        """
+
+        session = _client_session(self.project_key, self.pool_size)
+        headers = {"Content-Type": content_type} if content_type else None
+        async with session.request(
+            method, self.url + path, json=json, data=data, params=params, headers=headers
+        ) as res:
+            if res.status == 404:
+                return res.status, None
+            res.raise_for_status()
+            if not raw and res.content_type == "application/json":
+                return res.status, await res.json()
+            return res.status, await res.read()
+
+    async def stream(self, path, params, chunk_size) -> AsyncIterator[bytes]:
+        session = _client_session(self.project_key, self.pool_size)
+        async with session.get(self.url + path, params=params) as res:
+            if res.status == 404:
+                raise FileNotFoundError("404 File not found")
+            res.raise_for_status()
+            async for chunk in res.content.iter_chunked(chunk_size):
+                yield chunk
+
+
+class AsyncDetaBase:
+    """## Class AsyncDetaBase
+    Asyncio counterpart of `DetaBase`, for `async def` views. Calls share a non-blocking
+    connection pool, so several of them can run at once with `asyncio.gather`.
+
+    ### Attributes:
+        * `app (Flask)`: Flash app to contextualize class methods and attributes.
+
+        * `project_key (str)`: The DetaSpace Project key, or `app.config['DETA_PROJECT_KEY']`.
+
+        * `name (str)`: The name of your DetaSpace Base, or `app.config['BASE_NAME']`.
+
+        * `host (str)`: Optional host for API requests, or `app.config['BASE_HOST']`.
+
+        * `pool_size (int)`: Maximum number of open connections of the shared pool,
+                    `app.config['DETA_ASYNC_POOL_SIZE']`, 100 by default.
+
+    ### Methods:
+        *   `get(key)`, `put(data, key, expire_in, expire_at)`, `put_all(items, expire_in, expire_at, max_workers)`,
+            `update(key, updates, expire_in, expire_at)`, `delete(key)`, `get_all(limit)`:
+            Same as in `DetaBase`, as coroutines.
+
+        *   `iter_items(query, page_size)`: Async generator following the fetch cursor.
+    """
+
+    def __init__(self, app=None, project_key=None, name=None, host=None):
+        self.project_key = project_key
+        self.name = name
+        self.host = host
+        self.pool_size = 100
+        self.max_workers = 4
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initializes the extension and binds it to a Flask application instance.
+
+        Unlike `DetaBase`, no connection test is made, as it would need an event loop.
+        """
+
+        self.project_key = app.config.get("DETA_PROJECT_KEY", self.project_key)
+        self.name = self.name or app.config.get("BASE_NAME")
+        self.host = app.config.get("BASE_HOST", self.host)
+        self.pool_size = app.config.get("DETA_ASYNC_POOL_SIZE", self.pool_size)
+        self.max_workers = app.config.get("BASE_MAX_WORKERS", self.max_workers)
+
+        try:
+            self.service = _AsyncService(
+                self.project_key, self.name, self.host, "database.deta.sh", self.pool_size
+            )
+        except (KeyError, ValueError) as e:
+            raise TypeError(f">>> ERROR in AsyncDetaBase ==> {e}")
+
+        if not hasattr(app, "extensions"):
+            app.extensions = {}
+        extension = app.extensions.setdefault("flask_deta", {})
+        extension["async_base"] = self
+        extension.setdefault("async_bases", {})[self.name] = self
+
+    def _fail(self, msg, error=None):
+        current_app.logger.error(f"{msg} => {error}" if error else msg)
+        raise TypeError(msg)
+
+    async def get(self, key: str) -> dict:
+        """Retrieves the record stored under `key`, or `TypeError` if it does not exist."""
+
+        try:
+            _, record = await self.service.request("GET", f"/items/{quote(key, safe='')}")
+        except Exception as e:
+            self._fail(f"Error in 'AsyncDetaBase.get()' while getting '{key}'.", e)
+
+        if record:
+            return record
+        self._fail(
+            f"Error in 'AsyncDetaBase.get()' while getting '{key}'. Record not found due to incorrect identification key."
+        )
+
+    async def put(
+        self,
+        data: dict[Union[dict, list, tuple, int, str, bool]],
+        key: Optional[str] = None,
+        expire_in: Optional[int] = None,
+        expire_at: Optional[Union[int, float, datetime]] = None,
+    ) -> dict:
+        """Stores a record, overriding it if the key already exists."""
+
+        try:
+            item = dict(data) if isinstance(data, dict) else {"value": data}
+            if key:
+                item["key"] = key
+            expires = expiration(expire_in, expire_at)
+            if expires is not None:
+                item["__expires"] = expires
+            _, res = await self.service.request("PUT", "/items", json={"items": [item]})
+            return res["processed"]["items"][0]
+        except Exception as e:
+            self._fail("Error in 'AsyncDetaBase.put()' while storing data in the database.", e)
+
+    async def put_all(
+        self,
+        items: Iterable[dict],
+        expire_in: Optional[int] = None,
+        expire_at: Optional[Union[int, float, datetime]] = None,
+        max_workers: Optional[int] = None,
+    ) -> dict:
+        """Stores any number of records in concurrent batches of 25.
+
+        Returns `{"processed": {"items": [...]}, "failed": {"items": [...]}}`.
+        """
+
+        expires = expiration(expire_in, expire_at)
+
+        def prepare(batch):
+            batch = [dict(i) if isinstance(i, dict) else {"value": i} for i in batch]
+            if expires is not None:
+                for item in batch:
+                    item["__expires"] = expires
+            return batch
+
+        async def put_batch(batch):
+            _, res = await self.service.request("PUT", "/items", json={"items": batch})
+            return res.get("processed", {}).get("items", []), res.get("failed", {}).get("items", [])
+
+        processed, failed = [], []
+        batches = (prepare(batch) for batch in chunked(items, PUT_MANY_LIMIT))
+        async for batch, result, error in run_batches_async(put_batch, batches, max_workers or self.max_workers):
+            if error is not None:
+                current_app.logger.error(
+                    f"Error in 'AsyncDetaBase.put_all()' while storing a batch of {len(batch)} items => {error}"
+                )
+                failed.extend(batch)
+                continue
+            processed.extend(result[0])
+            failed.extend(result[1])
+        return {"processed": {"items": processed}, "failed": {"items": failed}}
+
+    async def update(
+        self,
+        key: str,
+        updates: dict[Union[dict, list, tuple, int, str, bool]],
+        expire_in: Optional[int] = None,
+        expire_at: Optional[Union[int, float, datetime]] = None,
+    ):
+        """Sets the given fields of the record stored under `key`.
+
+        Only plain values are supported; the `Base.util` operations of the Deta SDK are not.
+        """
+
+        try:
+            updates = dict(updates)
+            expires = expiration(expire_in, expire_at)
+            if expires is not None:
+                updates["__expires"] = expires
+            status, _ = await self.service.request(
+                "PATCH", f"/items/{quote(key, safe='')}", json={"set": updates}
+            )
+            if status == 404:
+                raise KeyError(key)
+        except Exception as e:
+            self._fail(f"Error in 'AsyncDetaBase.update()' while updating record '{key}'.", e)
+
+    async def delete(self, key: str) -> str:
+        """Deletes the record stored under `key` and returns the key."""
+
+        try:
+            await self.service.request("DELETE", f"/items/{quote(key, safe='')}")
+            return key
+        except Exception as e:
+            self._fail(f"Error in 'AsyncDetaBase.delete()' while deleting '{key}'.", e)
+
+    async def iter_items(
+        self,
+        query: Optional[Union[dict, list[dict]]] = None,
+        page_size: int = 1000,
+    ) -> AsyncIterator[dict]:
+        """Lazily iterates over every record matching the query, following the fetch cursor."""
+
+        last = None
+        while True:
+            payload = {"limit": page_size}
+            if query is not None:
+                payload["query"] = query if isinstance(query, list) else [query]
+            if last:
+                payload["last"] = last
+
+            try:
+                _, res = await self.service.request("POST", "/query", json=payload)
+            except Exception as e:
+                self._fail(
+                    "Error in 'AsyncDetaBase.iter_items()' while retrieving data from the database.", e
+                )
+
+            for item in res.get("items", []):
+                yield item
+
+            last = res.get("paging", {}).get("last")
+            if not last:
+                break
+
+    async def get_all(self, limit: int = 1000) -> list[dict]:
+        """Retrieves up to `limit` records, in a single page."""
+
+        records = []
+        async for record in self.iter_items(page_size=limit):
+            records.append(record)
+            if len(records) >= limit:
+                break
+        return records
+
+
+class AsyncDetaDrive:
+    """## Class AsyncDetaDrive
+    Asyncio counterpart of `DetaDrive`, for `async def` views. Calls share a non-blocking
+    connection pool, so several of them can run at once with `asyncio.gather`.
+
+    ### Attributes:
+        * `app (Flask)`: Flash app to contextualize class methods and attributes.
+
+        * `project_key (str)`: The DetaSpace Project key, or `app.config['DETA_PROJECT_KEY']`.
+
+        * `name (str)`: The name of your DetaSpace Drive, or `app.config['DRIVE_NAME']`.
+
+        * `host (str)`: Optional host for API requests, or `app.config['DRIVE_HOST']`.
+
+        * `part_size (int)`: Size in bytes of each uploaded part, `app.config['DRIVE_UPLOAD_PART_SIZE']`.
+
+        * `pool_size (int)`: Maximum number of open connections of the shared pool,
+                    `app.config['DETA_ASYNC_POOL_SIZE']`, 100 by default.
+
+    ### Methods:
+        *   `all_files(limit, prefix)`, `get_file(name)`, `put_file(name, data, path, type)`,
+            `delete_file(name)`, `delete_many(names, prefix)`: Same as in `DetaDrive`, as coroutines.
+
+        *   `iter_files(prefix, start_after, page_size)`: Async generator following the listing cursor.
+
+        *   `stream_file(name, chunk_size)`: Async generator yielding the content of a file in chunks.
+    """
+
+    def __init__(self, app=None, project_key=None, name=None, host=None):
+        self.project_key = project_key
+        self.name = name
+        self.host = host
+        self.pool_size = 100
+        self.part_size = 10 * 1024 * 1024
+        self.max_workers = 4
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initializes the extension and binds it to a Flask application instance.
+
+        Unlike `DetaDrive`, no connection test is made, as it would need an event loop.
+        """
+
+        self.project_key = app.config.get("DETA_PROJECT_KEY", self.project_key)
+        self.name = self.name or app.config.get("DRIVE_NAME")
+        self.host = app.config.get("DRIVE_HOST", self.host)
+        self.pool_size = app.config.get("DETA_ASYNC_POOL_SIZE", self.pool_size)
+        self.part_size = app.config.get("DRIVE_UPLOAD_PART_SIZE", self.part_size)
+        self.max_workers = app.config.get("DRIVE_MAX_WORKERS", self.max_workers)
+
+        try:
+            self.service = _AsyncService(
+                self.project_key, self.name, self.host, "drive.deta.sh", self.pool_size
+            )
+        except (KeyError, ValueError) as e:
+            raise TypeError(f">>> ERROR in AsyncDetaDrive ==> {e}")
+
+        if not hasattr(app, "extensions"):
+            app.extensions = {}
+        extension = app.extensions.setdefault("flask_deta", {})
+        extension["async_drive"] = self
+        extension.setdefault("async_drives", {})[self.name] = self
+
+    async def all_files(
+        self, limit: Optional[int] = 1000, prefix: Optional[str] = None
+    ) -> list:
+        """Fetches the names of up to `limit` files, in a single page."""
+
+        try:
+            names = []
+            async for name in self.iter_files(prefix=prefix, page_size=limit):
+                names.append(name)
+                if len(names) >= limit:
+                    break
+            return names
+        except Exception as e:
+            raise Exception(f"Error in 'AsyncDetaDrive.all_files()' method => {e}")
+
+    async def iter_files(
+        self,
+        prefix: Optional[str] = None,
+        start_after: Optional[str] = None,
+        page_size: int = 1000,
+    ) -> AsyncIterator[str]:
+        """Lazily iterates over the names of every file, following the listing cursor."""
+
+        last = start_after
+        while True:
+            params = {"limit": page_size}
+            if prefix:
+                params["prefix"] = prefix
+            if last:
+                params["last"] = last
+
+            try:
+                _, files = await self.service.request("GET", "/files", params=params)
+            except Exception as e:
+                raise Exception(f"Error in 'AsyncDetaDrive.iter_files()' method => {e}")
+
+            for name in files.get("names", []):
+                yield name
+
+            last = files.get("paging", {}).get("last")
+            if not last:
+                break
+
+    async def _pages(self, prefix: str) -> AsyncIterator[list]:
+        """Yields the names of the files under `prefix` in lists of at most `DELETE_MANY_LIMIT`."""
+
+        batch = []
+        async for name in self.iter_files(prefix=prefix, page_size=DELETE_MANY_LIMIT):
+            batch.append(name)
+            if len(batch) >= DELETE_MANY_LIMIT:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def get_file(self, name: str) -> bytes:
+        """Fetches the whole content of a file, or Exception if it does not exist."""
+
+        if not name:
+            raise Exception(
+                "Error in 'AsyncDetaDrive.get_file()' method => The name has not been provided"
+            )
+
+        try:
+            _, content = await self.service.request(
+                "GET", "/files/download", params={"name": name}, raw=True
+            )
+        except Exception as e:
+            raise Exception(f"Error in 'AsyncDetaDrive.get_file()' method => {e}")
+
+        if content is None:
+            raise Exception("Error in 'AsyncDetaDrive.get_file()' method => 404 File not found")
+        return content
+
+    async def stream_file(self, name: str, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+        """Yields the content of a file in chunks, without buffering it in memory."""
+
+        try:
+            async for chunk in self.service.stream(
+                "/files/download", {"name": name}, chunk_size
+            ):
+                yield chunk
+        except Exception as e:
+            raise Exception(f"Error in 'AsyncDetaDrive.stream_file()' method => {e}")
+
+    async def put_file(
+        self,
+        name: str,
+        data: Union[str, bytes, io.TextIOBase, io.BufferedIOBase, io.RawIOBase] = None,
+        path: Optional[str] = None,
+        type: Optional[str] = None,
+    ) -> str:
+        """Saves a file, in concurrent parts when it is larger than `part_size`.
+
+        IMPORTANT: You must pass either `data` or `path` but not both.
+        """
+
+        if not name:
+            raise Exception("Error in 'AsyncDetaDrive.put_file()' method => Drive name is not provided")
+        if (data is None) == (path is None):
+            raise Exception(
+                "Error in 'AsyncDetaDrive.put_file()' method => Please provide data or a path, but not both"
+            )
+
+        if isinstance(data, (str, bytes)):
+            source = io.BytesIO(data.encode() if isinstance(data, str) else data)
+        else:
+            source = data if path is None else open(path, "rb")
+
+        async def read_part():
+            part = await asyncio.to_thread(source.read, self.part_size)
+            return part.encode() if isinstance(part, str) else part
+
+        try:
+            first = await read_part()
+            second = await read_part()
+            if not second:
+                await self.service.request(
+                    "POST", "/files", params={"name": name}, data=first, content_type=type
+                )
+                return name
+            return await self._upload_parts(name, [first, second], read_part, type)
+        except Exception as e:
+            raise Exception(f"Error in 'AsyncDetaDrive.put_file()' method => {e}")
+        finally:
+            if path is not None:
+                source.close()
+
+    async def _upload_parts(self, name, head, read_part, type) -> str:
+        params = {"name": name}
+        _, res = await self.service.request("POST", "/uploads", params=params)
+        upload_id = res["upload_id"]
+
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def upload_part(number, chunk):
+            try:
+                await self.service.request(
+                    "POST",
+                    f"/uploads/{upload_id}/parts",
+                    params={"name": name, "part": number},
+                    data=chunk,
+                    content_type=type,
+                )
+            finally:
+                semaphore.release()
+
+        tasks = []
+        try:
+            number = 0
+            chunk = head.pop(0)
+            while chunk:
+                await semaphore.acquire()
+                number += 1
+                tasks.append(asyncio.create_task(upload_part(number, chunk)))
+                chunk = head.pop(0) if head else await read_part()
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await self.service.request("DELETE", f"/uploads/{upload_id}", params=params)
+            raise
+
+        await self.service.request("PATCH", f"/uploads/{upload_id}", params=params)
+        return name
+
+    async def delete_file(self, name: str) -> str:
+        """Removes a file and returns its name."""
+
+        try:
+            _, res = await self.service.request("DELETE", "/files", json={"names": [name]})
+            if name in res.get("failed", {}):
+                raise ValueError(res["failed"][name])
+            return name
+        except Exception as e:
+            raise Exception(f"Error in 'AsyncDetaDrive.delete_file()' method => {e}")
+
+    async def delete_many(
+        self, names: Optional[Iterable[str]] = None, prefix: Optional[str] = None
+    ) -> dict:
+        """Removes files by names or prefix, in concurrent batches of 1000.
+
+        Returns `{"deleted": [...], "failed": {name: reason}}`.
+        """
+
+        if names is None and prefix is None:
+            raise Exception(
+                "Error in 'AsyncDetaDrive.delete_many()' method => Names or a prefix must be provided"
+            )
+        if names is None:
+            # Each listed page is deleted as it arrives, so the names are never all held at once.
+            batches = self._pages(prefix)
+        else:
+            batches = chunked(names, DELETE_MANY_LIMIT)
+
+        async def delete_batch(batch):
+            _, res = await self.service.request("DELETE", "/files", json={"names": batch})
+            return res.get("deleted", []), res.get("failed", {})
+
+        deleted, failed = [], {}
+        async for batch, result, error in run_batches_async(delete_batch, batches, self.max_workers):
+            if error is not None:
+                failed.update({name: str(error) for name in batch})
+                continue
+            deleted.extend(result[0])
+            failed.update(result[1])
+        return {"deleted": deleted, "failed": failed}
@@ -0,0 +1,121 @@
+import asyncio
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from itertools import islice
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Iterator, Optional, Union
+
+# Maximum number of items accepted by a single `put_many` call of the Deta service.
+PUT_MANY_LIMIT = 25
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    """Splits any iterable, including generators, into lists of at most `size` elements."""
+
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def run_batches(
+    func: Callable[[Any], Any],
+    batches: Iterable[Any],
+    max_workers: int = 4,
+) -> Iterator[tuple[Any, Any, Optional[Exception]]]:
+    """Runs `func` over every batch on a bounded thread pool.
+
+    Batches are pulled lazily, so at most `2 * max_workers` of them are held in memory
+    at once. Yields `(batch, result, error)` tuples in completion order, where `error`
+    is the exception raised by `func`, if any. With `max_workers <= 1` the batches are
+    processed serially in the calling thread. Worker threads run in a copy of the caller's
+    context, so context variables (such as the call being measured) are visible to them.
+    """
+
+    if max_workers <= 1:
+        for batch in batches:
+            try:
+                yield batch, func(batch), None
+            except Exception as e:
+                yield batch, None, e
+        return
+
+    batches = iter(batches)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+
+        def submit(count):
+            for batch in islice(batches, count):
+                context = contextvars.copy_context()
+                pending[executor.submit(context.run, func, batch)] = batch
+
+        submit(2 * max_workers)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = pending.pop(future)
+                error = future.exception()
+                yield batch, (None if error else future.result()), error
+            submit(len(done))
+
+
+async def _aiter(iterable: Iterable) -> AsyncIterator:
+    for item in iterable:
+        yield item
+
+
+async def run_batches_async(
+    func: Callable[[Any], Awaitable],
+    batches: Union[Iterable[Any], AsyncIterable[Any]],
+    max_workers: int = 4,
+) -> AsyncIterator[tuple[Any, Any, Optional[Exception]]]:
+    """Async counterpart of `run_batches`: awaits `func` over every batch, `max_workers` at once.
+
+    Batches, from an iterable or an async iterable, are pulled lazily as tasks complete, so at
+    most `max_workers` of them are held in memory at once. Yields `(batch, result, error)`
+    tuples in completion order; the tasks still running are cancelled if the caller stops early.
+    """
+
+    batches = (batches if hasattr(batches, "__aiter__") else _aiter(batches)).__aiter__()
+    pending = {}
+
+    async def submit(count):
+        for _ in range(count):
+            try:
+                batch = await batches.__anext__()
+            except StopAsyncIteration:
+                return
+            pending[asyncio.ensure_future(func(batch))] = batch
+
+    try:
+        await submit(max(max_workers, 1))
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                batch = pending.pop(task)
+                error = task.exception()
+                yield batch, (None if error else task.result()), error
+            await submit(len(done))
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def expiration(
+    expire_in: Optional[int] = None,
+    expire_at: Optional[Union[int, float, datetime]] = None,
+) -> Optional[int]:
+    """Returns the `__expires` Unix timestamp of an item, as computed by the Deta SDK."""
+
+    if expire_in is not None and expire_at is not None:
+        raise ValueError("Both expire_in and expire_at provided")
+    if expire_in is not None:
+        return int(time.time()) + expire_in
+    if isinstance(expire_at, datetime):
+        return int(expire_at.timestamp())
+    if expire_at is not None:
+        return int(expire_at)
+    return None
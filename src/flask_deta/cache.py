@@ -0,0 +1,337 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+
+
+class TTLCache:
+    """## Class TTLCache
+    Thread-safe LRU cache whose entries expire after a fixed time to live.
+
+    ### Attributes:
+        * `max_entries (int)`: Maximum number of entries kept; the least recently used
+            entry is evicted when the cache is full.
+
+        * `ttl (float)`: Seconds an entry stays valid after being stored.
+
+        * `negative (bool)`: Whether misses (`None` values) are cached too, so repeated
+            lookups of a missing key do not reach the network.
+
+        * `hits`, `misses`, `evictions`, `expirations (int)`: Counters to tune the cache.
+
+    Values read after a miss are stored with `reserve()` and `fill()`: a `set()` or an
+    `invalidate()` of the key in between voids the fill, so a read that raced a write
+    can not put the previous value back.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0, negative: bool = False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative = negative
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self._entries = OrderedDict()
+        self._fills = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, key: Hashable) -> tuple[bool, Any]:
+        """Returns `(True, value)` for a fresh entry or `(False, None)` otherwise."""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+
+    def set(self, key: Hashable, value: Any):
+        """Stores a value, a `None` value is only kept when negative caching is enabled."""
+
+        with self._lock:
+            self._fills.pop(key, None)
+            self._store(key, value)
+
+    def _store(self, key: Hashable, value: Any):
+        if value is None and not self.negative:
+            self._entries.pop(key, None)
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def reserve(self, key: Hashable) -> object:
+        """Returns the token with which to `fill()` the key after a miss."""
+
+        with self._lock:
+            return self._fills.setdefault(key, object())
+
+    def fill(self, key: Hashable, value: Any, token: object, store: bool = True):
+        """Stores a value read after `reserve()`, unless the key was written or invalidated since.
+
+        With `store=False`, the reservation is only released.
+        """
+
+        with self._lock:
+            if self._fills.get(key) is not token:
+                return
+            del self._fills[key]
+            if store:
+                self._store(key, value)
+
+    def invalidate(self, key: Hashable):
+        """Drops the entry for `key`, if any, and voids the pending fills of the key."""
+
+        with self._lock:
+            self._fills.pop(key, None)
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drops every entry, counters are kept."""
+
+        with self._lock:
+            self._fills.clear()
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Returns the hit, miss, eviction and expiration counters and the current size."""
+
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+class DiskCache:
+    """## Class DiskCache
+    Size-bounded directory of downloaded Drive objects with LRU eviction.
+
+    Each object is stored under the SHA-256 of its name, next to a small JSON sidecar
+    holding its name, size, content type and strong ETag (the SHA-256 of its content).
+    The directory can be shared by several worker processes: entries written by another
+    process are picked up from disk, and invalidations remove the files for everyone.
+    Writes made elsewhere (another host, or a process with its own directory) are not seen,
+    so the entries expire after `ttl` seconds and are downloaded again.
+
+    ### Attributes:
+        * `directory (str)`: Directory where the objects are stored.
+
+        * `max_bytes (int)`: Maximum total size of the cached objects.
+
+        * `ttl (float | None)`: Seconds an object stays valid after being downloaded,
+            3600 by default. None keeps it until it is evicted or invalidated.
+
+        * `hits`, `misses`, `evictions`, `expirations (int)`: Counters to tune the cache.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024, ttl: Optional[float] = 3600.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(name.encode()).hexdigest())
+
+    def _read_entry(self, path: str) -> Optional[dict]:
+        try:
+            with open(f"{path}.json") as meta:
+                entry = json.load(meta)
+            entry["path"] = path
+            return entry if os.path.exists(path) else None
+        except (OSError, ValueError):
+            return None
+
+    def _load(self):
+        found = []
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".json"):
+                entry = self._read_entry(os.path.join(self.directory, filename[:-5]))
+                if entry is not None:
+                    found.append((os.path.getmtime(entry["path"]), entry))
+
+        for _, entry in sorted(found, key=lambda item: item[0]):
+            self._entries[entry["name"]] = entry
+            self._size += entry["size"]
+        self._evict()
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._size -= entry["size"]
+            self.evictions += 1
+            self._remove(entry["path"])
+
+    @staticmethod
+    def _remove(path: str):
+        for target in (path, f"{path}.json"):
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+
+    def lookup(self, name: str) -> Optional[dict]:
+        """Returns the entry (`path`, `etag`, `mimetype`, `size`) of a cached object, or None."""
+
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or not os.path.exists(entry["path"]):
+                if entry is not None:
+                    self._entries.pop(name)
+                    self._size -= entry["size"]
+                entry = self._read_entry(self._path(name))
+                if entry is None:
+                    self.misses += 1
+                    return None
+                self._entries[name] = entry
+                self._size += entry["size"]
+
+            # Wall-clock time, since the entries are shared between processes.
+            if self.ttl is not None and time.time() - entry.get("stored_at", 0) >= self.ttl:
+                self._entries.pop(name)
+                self._size -= entry["size"]
+                self._remove(entry["path"])
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(name)
+            self.hits += 1
+
+        try:
+            os.utime(entry["path"])
+        except OSError:
+            pass
+        return entry
+
+    def store(self, name: str, chunks: Iterable[bytes], mimetype: Optional[str] = None) -> dict:
+        """Writes an object to the cache while hashing it, then evicts the least recently used ones.
+
+        Objects larger than `max_bytes` are not registered; their entry is flagged as
+        `transient` and the caller is responsible for removing `entry["path"]` once used.
+        """
+
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    tmp.write(chunk)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+
+        entry = {
+            "name": name,
+            "size": size,
+            "etag": digest.hexdigest(),
+            "mimetype": mimetype,
+            "stored_at": time.time(),
+        }
+
+        if size > self.max_bytes:
+            entry["path"] = tmp_path
+            entry["transient"] = True
+            return entry
+
+        path = self._path(name)
+        with open(f"{path}.json", "w") as meta:
+            json.dump(entry, meta)
+        os.replace(tmp_path, path)
+        entry["path"] = path
+
+        with self._lock:
+            previous = self._entries.pop(name, None)
+            if previous is not None:
+                self._size -= previous["size"]
+            self._entries[name] = entry
+            self._size += size
+            self._evict()
+        return entry
+
+    def invalidate(self, name: str):
+        """Removes a cached object, if any."""
+
+        with self._lock:
+            entry = self._entries.pop(name, None)
+            if entry is not None:
+                self._size -= entry["size"]
+        self._remove(self._path(name))
+
+    def stats(self) -> dict:
+        """Returns the hit, miss, eviction and expiration counters and the current size in bytes."""
+
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "size": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def cache_from_config(config, prefix: str) -> Optional[TTLCache]:
+    """Builds a `TTLCache` from `<prefix>_CACHE_*` config keys, or None when it is disabled."""
+
+    max_entries = config.get(f"{prefix}_CACHE_MAX_ENTRIES")
+    if not max_entries:
+        return None
+
+    return TTLCache(
+        max_entries=int(max_entries),
+        ttl=float(config.get(f"{prefix}_CACHE_TTL", 60)),
+        negative=bool(config.get(f"{prefix}_CACHE_NEGATIVE", False)),
+    )
+
+
+def disk_cache_from_config(config, prefix: str) -> Optional[DiskCache]:
+    """Builds a `DiskCache` from `<prefix>_CACHE_*` config keys, or None when it is disabled."""
+
+    directory = config.get(f"{prefix}_CACHE_DIR")
+    if not directory:
+        return None
+
+    ttl = config.get(f"{prefix}_CACHE_TTL", 3600.0)
+    return DiskCache(
+        directory=directory,
+        max_bytes=int(config.get(f"{prefix}_CACHE_MAX_BYTES", 512 * 1024 * 1024)),
+        ttl=None if ttl is None else float(ttl),
+    )
@@ -0,0 +1,94 @@
+import json
+from typing import Optional
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+deta_cli = AppGroup("deta", help="Flask-Deta maintenance commands.")
+
+
+def register_cli(app):
+    """Adds the `flask deta` command group to an app, once."""
+
+    if "deta" not in app.cli.commands:
+        app.cli.add_command(deta_cli)
+
+
+def _registered(kind: str, name: Optional[str] = None):
+    """Returns a DetaBase/DetaDrive registered by `init_app`, by name or the only one registered."""
+
+    extension = current_app.extensions.get("flask_deta", {})
+    registry = extension.get(f"{kind}s", {})
+    if name is None:
+        if len(registry) == 1:
+            return next(iter(registry.values()))
+        raise click.UsageError(f"Several {kind}s are registered, choose one of: {', '.join(registry)}")
+    if name not in registry:
+        raise click.UsageError(f"Unknown {kind} '{name}', choose one of: {', '.join(registry) or '-'}")
+    return registry[name]
+
+
+@deta_cli.command("rebuild-indexes")
+@click.argument("base", required=False)
+@click.option("--field", "fields", multiple=True, help="Indexed field to rebuild (repeatable). Defaults to all.")
+@click.option("--prune", is_flag=True, help="Also delete entries of removed records and unindexed fields.")
+def rebuild_indexes_command(base, fields, prune):
+    """Backfills the secondary indexes of a Base."""
+
+    result = _registered("base", base).rebuild_indexes(fields or None, prune=prune)
+    click.echo(f"Indexed {result['indexed']} records, pruned {result['pruned']} entries.")
+
+
+@deta_cli.command("sync")
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+@click.option("--drive", help="Name of the Drive. Defaults to the only one registered.")
+@click.option("--prefix", default="", help="Prefix of the file names in the Drive.")
+@click.option("--no-delete", is_flag=True, help="Keep the files missing from the directory.")
+@click.option("--dry-run", is_flag=True, help="Only list what would be uploaded and deleted.")
+def sync_command(directory, drive, prefix, no_delete, dry_run):
+    """Uploads the new and modified files of a directory to a Drive."""
+
+    result = _registered("drive", drive).sync_dir(directory, prefix, delete=not no_delete, dry_run=dry_run)
+    for name in result["uploaded"]:
+        click.echo(f"{'would upload' if dry_run else 'uploaded'} {name}")
+    for name in result["deleted"]:
+        click.echo(f"{'would delete' if dry_run else 'deleted'} {name}")
+    for name, reason in result["failed"].items():
+        click.echo(f"failed {name}: {reason}", err=True)
+    click.echo(
+        f"{len(result['uploaded'])} uploaded, {len(result['deleted'])} deleted, "
+        f"{len(result['unchanged'])} unchanged, {len(result['failed'])} failed."
+    )
+    if result["failed"]:
+        raise SystemExit(1)
+
+
+@deta_cli.command("export")
+@click.argument("file", type=click.Path(dir_okay=False, allow_dash=True))
+@click.option("--base", help="Name of the Base. Defaults to the only one registered.")
+@click.option("--query", help="Deta query, as JSON, of the exported records.")
+def export_command(file, base, query):
+    """Exports the records of a Base to an NDJSON file (gzipped if it ends with .gz)."""
+
+    try:
+        query = json.loads(query) if query else None
+    except ValueError as e:
+        raise click.BadParameter(f"invalid JSON => {e}", param_hint="--query")
+
+    target = click.get_binary_stream("stdout") if file == "-" else file
+    count = _registered("base", base).export_ndjson(target, query)
+    click.echo(f"Exported {count} records.", err=True)
+
+
+@deta_cli.command("import")
+@click.argument("file", type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option("--base", help="Name of the Base. Defaults to the only one registered.")
+def import_command(file, base):
+    """Imports the records of an NDJSON file (gzipped if it ends with .gz) into a Base."""
+
+    source = click.get_binary_stream("stdin") if file == "-" else file
+    result = _registered("base", base).import_ndjson(source)
+    click.echo(f"Imported {result['imported']} records, {result['failed']} failed.", err=True)
+    if result["failed"]:
+        raise SystemExit(1)
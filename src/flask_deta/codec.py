@@ -0,0 +1,180 @@
+import base64
+import json
+import zlib
+from typing import Iterable, Optional
+
+# Name of the envelope holding a compressed value (a field) or the compressed part of a record.
+MARKER = "__z"
+
+# Fields never compressed: the key and the expiration handled by the Deta service.
+RESERVED_FIELDS = ("key", "__expires")
+
+# Class names of the SDK `util` operations, applied by the server to the stored value.
+UPDATE_OPERATIONS = ("Trim", "Increment", "Append", "Prepend")
+
+
+def _pack(value, level: int) -> str:
+    data = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+    return base64.b85encode(zlib.compress(data, level)).decode()
+
+
+def _unpack(text: str):
+    return json.loads(zlib.decompress(base64.b85decode(text)))
+
+
+def _is_envelope(value) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and MARKER in value
+
+
+class RecordCodec:
+    """## Class RecordCodec
+    Compresses large values of Base records into `{"__z": "..."}` envelopes (JSON, zlib and
+    base85, about 25% smaller than base64), and decodes them back on read.
+
+    ### Attributes:
+        * `fields (list[str])`: Top-level fields whose values are compressed when they are large.
+
+        * `whole_record (bool)`: Compress every field of the record together into a `__z`
+            field, except the `keep` fields, `key` and `__expires`.
+
+        * `keep (list[str])`: Fields left uncompressed in whole-record mode, so they can
+            still be queried (indexed fields are always kept).
+
+        * `threshold (int)`: Minimum size, in bytes of compact JSON, of a value (or of the
+            compressible part of a record) to compress it.
+
+        * `level (int)`: zlib compression level, from 1 (fastest) to 9 (smallest).
+    """
+
+    def __init__(
+        self,
+        fields: Optional[Iterable[str]] = None,
+        whole_record: bool = False,
+        keep: Optional[Iterable[str]] = None,
+        threshold: int = 1024,
+        level: int = 6,
+    ):
+        self.fields = list(fields or [])
+        self.whole_record = whole_record
+        self.keep = list(keep or [])
+        self.threshold = threshold
+        self.level = level
+
+    def _compressible(self, value) -> Optional[str]:
+        """Returns the packed value, or None when it is too small or would not shrink."""
+
+        size = len(json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode())
+        if size < self.threshold:
+            return None
+        packed = _pack(value, self.level)
+        return packed if len(packed) + len(MARKER) + 8 < size else None
+
+    def encode(self, item):
+        """Returns a copy of an item to be written, with its large values compressed."""
+
+        if not isinstance(item, dict):
+            return item
+
+        if self.whole_record:
+            plain = {
+                field: value
+                for field, value in item.items()
+                if field in RESERVED_FIELDS or field in self.keep
+            }
+            rest = {field: value for field, value in item.items() if field not in plain}
+            packed = self._compressible(rest) if rest else None
+            if packed is None:
+                return item
+            plain[MARKER] = packed
+            return plain
+
+        encoded = dict(item)
+        for field in self.fields:
+            value = item.get(field)
+            if value is None or field in self.keep or _is_envelope(value):
+                continue
+            packed = self._compressible(value)
+            if packed is not None:
+                encoded[field] = {MARKER: packed}
+        return encoded
+
+    def encode_updates(self, updates: dict) -> dict:
+        """Returns a copy of the updates of `DetaBase.update()`, with large values compressed.
+
+        Only plain values set on compressed fields are encoded; in whole-record mode the
+        updated fields are stored uncompressed and take precedence over the envelope on read.
+
+        Raises `ValueError` for updates the server would apply to a compressed value instead
+        of the original one: nested paths, and `trim()`, `increment()`, `append()` or
+        `prepend()` of a field that may be in an envelope (any field not kept, in whole-record mode).
+        """
+
+        for path, value in updates.items():
+            field = path.split(".", 1)[0]
+            if field in RESERVED_FIELDS or field in self.keep:
+                continue
+            if not self.whole_record and field not in self.fields:
+                continue
+            # Trimming a compressed field is safe, unless the envelope holds it with others.
+            unsafe = UPDATE_OPERATIONS if self.whole_record else UPDATE_OPERATIONS[1:]
+            operation = type(value).__name__
+            if operation in unsafe or "." in path:
+                how = f"{operation.lower()}()" if operation in unsafe else "a nested path"
+                raise ValueError(
+                    f"'{path}' can not be updated with {how} because '{field}' may be compressed,"
+                    " set the whole field instead"
+                )
+
+        if self.whole_record:
+            return updates
+
+        encoded = dict(updates)
+        for field in self.fields:
+            value = updates.get(field)
+            if isinstance(value, (str, int, float, bool, list, dict)) and field not in self.keep:
+                packed = self._compressible(value)
+                if packed is not None:
+                    encoded[field] = {MARKER: packed}
+        return encoded
+
+    def decode(self, record, fields: Optional[Iterable[str]] = None):
+        """Returns a copy of a stored record with its envelopes decoded, or the record itself.
+
+        With `fields` (top-level names), only what is needed to read them is decompressed.
+        """
+
+        if not isinstance(record, dict):
+            return record
+
+        decoded = None
+        if MARKER in record and (fields is None or any(field not in record for field in fields)):
+            decoded = _unpack(record[MARKER])
+            decoded.update((field, value) for field, value in record.items() if field != MARKER)
+
+        for field in self.fields if fields is None else set(self.fields).intersection(fields):
+            value = (decoded or record).get(field)
+            if _is_envelope(value):
+                decoded = decoded if decoded is not None else dict(record)
+                decoded[field] = _unpack(value[MARKER])
+
+        return decoded if decoded is not None else record
+
+
+def codec_from_config(config, prefix: str, keep: Iterable[str] = ()) -> Optional[RecordCodec]:
+    """Builds a `RecordCodec` from `<prefix>_COMPRESS_*` config keys, or None when it is disabled.
+
+    `keep` adds fields that must stay queryable, such as indexed fields.
+    """
+
+    fields = config.get(f"{prefix}_COMPRESS_FIELDS")
+    whole_record = config.get(f"{prefix}_COMPRESS_RECORD", False)
+    if not fields and not whole_record:
+        return None
+
+    return RecordCodec(
+        fields=fields,
+        whole_record=whole_record,
+        keep=list(config.get(f"{prefix}_COMPRESS_KEEP", [])) + list(keep),
+        threshold=int(config.get(f"{prefix}_COMPRESS_THRESHOLD", 1024)),
+        level=int(config.get(f"{prefix}_COMPRESS_LEVEL", 6)),
+    )
@@ -1,8 +1,27 @@
+import itertools
+import os
+import threading
+import time
+import uuid
 from datetime import datetime
-from typing import Optional, Union
+from typing import IO, Iterable, Iterator, Optional, Union
 
-from flask import current_app
-from .validator import verify_setups
+from flask import current_app, g, has_request_context
+
+from .aggregate import AGGREGATES, fold, fold_groups, project
+from .batching import PUT_MANY_LIMIT, chunked, expiration, run_batches
+from .cache import cache_from_config
+from .cli import register_cli
+from .codec import codec_from_config
+from .indexes import INDEXABLE_TYPES, SecondaryIndex, indexes_from_config
+from .local import backend_from_config
+from .metrics import instrumented, metrics_from_config
+from .resilience import resilience_from_config
+from .responses import FORMATS, negotiate_format, stream_records
+from .sync import open_ndjson, read_ndjson, write_ndjson
+from .transport import transport_from_config
+from .validator import build_instance, check_connection, verify_setups
+from .write_behind import write_behind_from_config
 
 
 class DetaBase:
@@ -31,28 +50,90 @@ class DetaBase:
                     the requests will be sent. The default Deta host URL will be used.
                     `host = "https://database.deta.sh"` -> app.config['BASE_HOST']
 
+        * `cache (TTLCache | None)`: Optional read-through cache for `get()`, enabled with
+                    `app.config['BASE_CACHE_MAX_ENTRIES']`. Its `stats()` exposes hit, miss
+                    and eviction counters.
+
+        * `identity_map (bool)`: Whether `get()` and `get_many()` remember the records read during
+                    a request (in Flask's `g`), so each key reaches the network only once per request.
+                    `app.config['BASE_IDENTITY_MAP']`, False by default.
+
+        * `max_workers (int)`: Number of batches sent at once by bulk operations.
+                    `app.config['BASE_MAX_WORKERS']`, 4 by default.
+
+        * `write_behind (WriteBehindBuffer | None)`: Optional buffer of pending `put()` calls,
+                    flushed in batches by a background thread. Enabled with `app.config['BASE_WRITE_BEHIND']`.
+
+        * `indexes (list[str])`: Fields with a secondary index, kept in the `<name>_index` Base. Passed
+                    manually or defined in `app.config['BASE_INDEXES']`.
+
+        * `codec (RecordCodec | None)`: Optional compression of large values, enabled with
+                    `app.config['BASE_COMPRESS_FIELDS']` or `app.config['BASE_COMPRESS_RECORD']`.
+
     ### Methods:
         *  `init_app(app: Flask)`: Initializes the extension and binds it to a Flask application instance.
 
+        *  `health_check()`: Tests the connection to the Deta Base; deferred to first use when `app.config['DETA_LAZY_INIT']` is set.
+
         *   `get_all(limit: int = 1000)`:Fetches all data stored in the Deta Base. By default it returns 1000 or 1MB.
 
+        *   `iter_items(query: dict | list[dict] = None, page_size: int = 1000)`: Lazily iterates over every
+            record matching the query, following the fetch cursor page by page.
+
         *   `get(key: str)`: Fetches a specific file from the Deta Base.
 
+        *   `get_many(keys: Iterable[str], max_workers: int = None)`: Fetches several records concurrently,
+            reporting missing keys as `None`.
+
+        *   `find_by(field: str, value, limit: int = None)`: Fetches the records whose indexed field equals a value.
+
+        *   `rebuild_indexes(fields: list[str] = None, prune: bool = False)`: Backfills the secondary indexes.
+
+        *   `count(query=None)`, `sum(field, query=None)`, `min(field, query=None)`, `max(field, query=None)`,
+            `group_by(by, query=None, field=None, func="count")`: Aggregate the records matching a query,
+            page by page, in constant memory.
+
         *   `put(data: dict[str|bytes|io.TextIOBase|io.BufferedIOBase|io.RawIOBase] = None, key: str = None, expire_in: int = None, expire_at: int|float|datetime = None)`:
             Saves a file in the Deta Cloud Base.
 
-        *   `put_all(items: list[dict], expire_in: int = None, expire_at: int | float | datetime = None,)`:
-            Store a list whit your dict[data] in the Deta database.
+        *   `put_all(items: Iterable[dict], expire_in: int = None, expire_at: int | float | datetime = None, max_workers: int = None)`:
+            Store any number of items in the Deta database, in concurrent batches of 25.
 
         *   `update(key: str, updates: dict[dict, list, tuple, int, str, bool], expire_in: int = None, expire_at: int | float | datetime = None)`: Saves a file in the DetaSpace database.
 
+        *   `flush()`: Blocks until every buffered `put()` has been written.
+
         *   `delete(key: str)`: Removes a file from the Deta Base.
+
+        *   `delete_many(keys: Iterable[str] = None, query: dict | list[dict] = None, max_workers: int = None)`:
+            Removes any number of records from the Deta Base, concurrently.
+
+        *   `stream_items(query=None, format=None, limit=None, cursor=None)`: Streams the records of a query
+            to the client as a JSON array or NDJSON, with cursor pagination links.
+
+        *   `export_ndjson(target, query=None)`, `import_ndjson(source)`: Stream the records to or from
+            an NDJSON file, optionally gzipped.
     """
 
-    def __init__(self, app=None, project_key=None, name=None, host=None):
+    def __init__(self, app=None, project_key=None, name=None, host=None, indexes=None):
         self.project_key = project_key
         self.name = name
         self.host = host
+        self.indexes = list(indexes) if indexes else None
+        self.index = None
+        self.codec = None
+        self.lazy = False
+        self._instance = None
+        self._verified = False
+        self.transport = None
+        self.backend = None
+        self.metrics = None
+        self.resilience = None
+        self.write_behind = None
+        self.identity_map = False
+        self.cache = None
+        self.max_workers = 4
+        self._local = threading.local()
 
         if app is not None:
             self.init_app(app)
@@ -79,15 +160,96 @@ class DetaBase:
         """
 
         self.project_key = app.config.get("DETA_PROJECT_KEY", self.project_key)
-        self.name = app.config.get("BASE_NAME", self.name)
+        self.name = self.name or app.config.get("BASE_NAME")
         self.host = app.config.get("BASE_HOST", self.host)
+        self.cache = cache_from_config(app.config, "BASE")
+        self.identity_map = app.config.get("BASE_IDENTITY_MAP", False)
+        self.max_workers = app.config.get("BASE_MAX_WORKERS", self.max_workers)
+
+        if self.write_behind is not None:
+            self.write_behind.close()
+        self.write_behind = write_behind_from_config(app.config, "BASE", self._flush_items)
+        if self.write_behind is not None and self.write_behind.durability == "flush_on_teardown":
+            app.teardown_appcontext(lambda exc: self.flush())
 
-        self.instance = verify_setups(self.project_key, self.name, self.host, "Base")
+        self.lazy = app.config.get("DETA_LAZY_INIT", False)
+        self.transport = transport_from_config(app)
+        self.backend = backend_from_config(app)
+        self.metrics = metrics_from_config(app)
+        self.resilience = resilience_from_config(app, self.transport)
+        self._instance = verify_setups(
+            self.project_key,
+            self.name,
+            self.host,
+            "Base",
+            lazy=self.lazy,
+            transport=self.transport,
+            client=self.backend,
+            metrics=self.metrics,
+            resilience=self.resilience,
+        )
+        self._verified = not self.lazy
+
+        if self.indexes is None:
+            self.indexes = indexes_from_config(app.config, "BASE", self.name)
+        self.index = None
+        if self.indexes:
+            self.index = SecondaryIndex(
+                self.indexes,
+                lambda: build_instance(
+                    self.project_key,
+                    f"{self.name}_index",
+                    self.host,
+                    "Base",
+                    self.transport,
+                    self.backend,
+                    self.metrics,
+                    self.resilience,
+                ),
+                shared=self.transport is not None or self.backend is not None,
+                max_workers=self.max_workers,
+            )
+        self.codec = codec_from_config(app.config, "BASE", keep=self.indexes)
+        register_cli(app)
 
         if not hasattr(app, "extensions"):
             app.extensions = {}
-        app.extensions["flask_deta"] = {"base": self}
+        extension = app.extensions.setdefault("flask_deta", {})
+        extension["base"] = self
+        extension.setdefault("bases", {})[self.name] = self
+
+    @property
+    def instance(self):
+        """The underlying Deta Base instance. In lazy mode, the connection is tested on first use."""
+
+        if self._instance is None:
+            raise TypeError(
+                ">>> ERROR in DetaBase ==> The extension has not been initialized with init_app()"
+            )
+        if not self._verified:
+            self.health_check()
+        return self._instance
 
+    @instance.setter
+    def instance(self, instance):
+        self._instance = instance
+        self._verified = True
+
+    @instrumented
+    def health_check(self) -> bool:
+        """Tests the connection to the Deta Base.
+
+        Called automatically on first use when `app.config['DETA_LAZY_INIT']` is set.
+
+        ### Returns:
+            True, or `KeyError`/`TypeError` if the key or the connection is wrong.
+        """
+
+        check_connection(self._instance, "Base")
+        self._verified = True
+        return True
+
+    @instrumented
     def put(
         self,
         data: dict[Union[dict, list, tuple, int, str, bool]],
@@ -111,6 +273,9 @@ class DetaBase:
 
         ### Returns:
             The result of the storage operation or TypeError.
+            With the write-behind buffer enabled, the item is queued and returned with its key
+            (generated if missing), and `TypeError` is raised when the buffer is full or a
+            previous batch failed.
 
         ### Example:
         ```
@@ -119,11 +284,17 @@ class DetaBase:
         ```
         """
 
+        if self.write_behind is not None:
+            return self._put_behind(data, key, expire_in, expire_at)
+
         try:
             crud = self.instance.put(
-                data=data, key=key, expire_in=expire_in, expire_at=expire_at
+                data=self.codec.encode(data) if self.codec is not None else data,
+                key=key,
+                expire_in=expire_in,
+                expire_at=expire_at,
             )
-            return crud
+            self._refresh_cached([crud], expiring=bool(expire_in or expire_at))
         except:
             msg = """Error in 'DetaBase.put()' while storing data in the database.
                 Possible causes include:"
@@ -134,24 +305,38 @@ class DetaBase:
             """
             raise TypeError(msg)
 
+        if self.index is not None:
+            self.index.write([crud])
+        return self._decode(crud)
+
+    @instrumented
     def put_all(
         self,
-        items: list[dict],
+        items: Iterable[dict],
         expire_in: Optional[int] = None,
         expire_at: Optional[int | float | datetime] = None,
-    ):
-        """Store a list whit your data in the Deta database.
+        max_workers: Optional[int] = None,
+    ) -> dict:
+        """Store any number of items in the Deta database.
+
+        The items are split into batches of 25 (the service limit per call), which are
+        sent concurrently over a bounded thread pool. Generators are consumed lazily.
 
         ### Args:
-            * `items`: list whit items to be stored. Can be a list whit dictionaries,
+            * `items`: Iterable whit items to be stored. Can contain dictionaries,
                 lists, strings, integers, or booleans.
 
             * `expire_in`: (Optional) Time in seconds until the data expires.
 
             * `expire_at`: (Optional) Unix timestamp or datetime when the data expires.
 
+            * `max_workers`: (Optional) Number of batches sent at once. Defaults to
+                `app.config['BASE_MAX_WORKERS']` or 4.
+
         ### Returns:
-            The result of the storage operation or `TypeError`.
+            A dict whit the written and the failed items,
+            `{"processed": {"items": [...]}, "failed": {"items": [...]}}`, or `TypeError`
+            if `items` is not iterable.
 
         ### Examples:
             >>> records = [
@@ -160,19 +345,56 @@ class DetaBase:
             ...     {"name" : "Guido", "age" : 52},
             ... ]
             >>>
-            >>> db.put_all(records)
+            >>> result = db.put_all(records)
+            >>> result["failed"]["items"]
+            []
         """
 
-        try:
-            crud = self.instance.put_many(
-                items=items, expire_in=expire_in, expire_at=expire_at
-            )
-            return crud
-        except:
-            msg = "Error in 'DetaBase.put_all()' while storing multiple items in the database."
+        if isinstance(items, (str, bytes, dict)) or not isinstance(items, Iterable):
+            msg = "Error in 'DetaBase.put_all()' while storing multiple items in the database. Items must be an iterable."
             current_app.logger.error(msg)
             raise TypeError(msg)
 
+        processed, failed = [], []
+        for written, rejected in self._put_batches(items, expire_in, expire_at, max_workers, "put_all"):
+            processed.extend(written)
+            failed.extend(rejected)
+
+        if self.codec is not None:
+            processed = [self._decode(item) for item in processed]
+            failed = [self._decode(item) for item in failed]
+        return {"processed": {"items": processed}, "failed": {"items": failed}}
+
+    def _put_batches(self, items, expire_in, expire_at, max_workers, method: str):
+        """Writes items in concurrent batches of 25, yielding the written and rejected items of each batch."""
+
+        if self.codec is not None:
+            items = map(self.codec.encode, items)
+
+        def put_batch(batch):
+            return self._worker_instance().put_many(
+                items=batch, expire_in=expire_in, expire_at=expire_at
+            )
+
+        for batch, res, error in run_batches(
+            put_batch,
+            chunked(items, PUT_MANY_LIMIT),
+            max_workers or self.max_workers,
+        ):
+            if error is not None:
+                current_app.logger.error(
+                    f"Error in 'DetaBase.{method}()' while storing a batch of {len(batch)} items => {error}"
+                )
+                yield [], batch
+                continue
+
+            written = res.get("processed", {}).get("items", [])
+            self._refresh_cached(written, expiring=bool(expire_in or expire_at))
+            if self.index is not None:
+                self.index.write(written)
+            yield written, res.get("failed", {}).get("items", [])
+
+    @instrumented
     def get(self, key: str) -> dict:
         """Retrieves data from the Deta Base database using the provided key.
 
@@ -186,14 +408,129 @@ class DetaBase:
             >>> key = "1122334455"
             >>> result = db.get(key)
         """
-        record = self.instance.get(key)
+        identity = self._identity()
+        if key in identity:
+            record = identity[key]
+        elif self.cache is not None:
+            found, record = self.cache.lookup(key)
+            if not found:
+                token = self.cache.reserve(key)
+                record = self.instance.get(key)
+                self.cache.fill(key, record or None, token, store=self._cacheable(record))
+        else:
+            record = self.instance.get(key)
+        identity[key] = record or None
+
         if record:
-            return record
+            return self._decode(record)
         else:
             msg = f"Error in 'DetaBase.get()' while getting '{key}'. Record not found due to incorrect identification key."
             current_app.logger.error(msg)
             raise TypeError(msg)
 
+    @instrumented
+    def get_many(
+        self, keys: Iterable[str], max_workers: Optional[int] = None
+    ) -> dict[str, Optional[dict]]:
+        """Retrieves several records at once using the provided keys.
+
+        Keys found in the identity map of the request or in the cache are not fetched
+        again; the rest are fetched concurrently over a bounded thread pool.
+
+        ### Args:
+            * `keys (Iterable[str])`: The keys associated with the data to be retrieved.
+            * `max_workers (int)`: (Optional) Number of records fetched at once. Defaults to
+                `app.config['BASE_MAX_WORKERS']` or 4.
+
+        ### Returns:
+            * A dict mapping each key to its record, or to `None` when the record does not exist.
+
+        ### Example:
+            >>> records = db.get_many(["1122334455", "5544332211"])
+            >>> missing = [key for key, record in records.items() if record is None]
+        """
+
+        if isinstance(keys, str) or not isinstance(keys, Iterable):
+            msg = "Error in 'DetaBase.get_many()' while getting records. Keys must be an iterable."
+            current_app.logger.error(msg)
+            raise TypeError(msg)
+
+        identity = self._identity()
+        records, pending = {}, []
+        for key in dict.fromkeys(keys):
+            if key in identity:
+                records[key] = identity[key]
+                continue
+            if self.cache is not None:
+                found, record = self.cache.lookup(key)
+                if found:
+                    records[key] = record
+                    continue
+            pending.append(key)
+
+        tokens = {key: self.cache.reserve(key) for key in pending} if self.cache is not None else {}
+
+        def get_key(key):
+            return self._worker_instance().get(key)
+
+        for key, record, error in run_batches(get_key, pending, max_workers or self.max_workers):
+            if error is not None:
+                msg = f"Error in 'DetaBase.get_many()' while getting '{key}'."
+                current_app.logger.error(f"{msg} => {error}")
+                raise TypeError(msg)
+            records[key] = record or None
+            if self.cache is not None:
+                self.cache.fill(key, records[key], tokens[key], store=self._cacheable(record))
+
+        identity.update(records)
+        return {key: (self._decode(record) if record else None) for key, record in records.items()}
+
+    @instrumented
+    def find_by(self, field: str, value, limit: Optional[int] = None) -> list[dict]:
+        """Retrieves the records whose indexed `field` is equal to `value`.
+
+        The keys are looked up in the secondary index (one query) and the records are then
+        fetched concurrently with `get_many()`. Records changed since their index entry was
+        written are checked again and left out when they no longer match.
+
+        ### Args:
+            * `field (str)`: An indexed field, declared in `indexes` or `app.config['BASE_INDEXES']`.
+            * `value (str | int | float | bool | None)`: The value to look for. `None` matches the
+                records where the field is missing, null or not a scalar.
+            * `limit (int)`: (Optional) Maximum number of index entries to look up.
+
+        ### Returns:
+            * A list with the matching records, or `TypeError` if the field is not indexed.
+
+        ### Example:
+            >>> db = DetaBase(app, indexes=["email"])
+            >>> users = db.find_by("email", "john@example.com")
+        """
+
+        if self.index is None or field not in self.indexes:
+            msg = f"Error in 'DetaBase.find_by()' while looking up '{field}'. The field is not indexed."
+            current_app.logger.error(msg)
+            raise TypeError(msg)
+
+        try:
+            keys = self.index.lookup(field, value, limit)
+        except Exception as e:
+            msg = f"Error in 'DetaBase.find_by()' while looking up '{field}' in the index."
+            current_app.logger.error(f"{msg} => {e}")
+            raise TypeError(msg)
+
+        records = self.get_many(keys)
+        found = []
+        for key in keys:
+            record = records.get(key)
+            if record is None:
+                continue
+            current = record.get(field)
+            if (current if isinstance(current, INDEXABLE_TYPES) else None) == value:
+                found.append(record)
+        return found
+
+    @instrumented
     def get_all(self, limit: int = 1000) -> list[dict]:
         """Retrieves all data from the Deta database.
 
@@ -210,12 +547,242 @@ class DetaBase:
         """
         try:
             fetch = self.instance.fetch(limit=limit).items
+            if self.codec is not None:
+                fetch = [self.codec.decode(record) for record in fetch]
             return fetch
         except Exception as e:
             msg = f"Error in 'DetaBase.get_all()' while retrieving data from the database."
             current_app.logger.error(f"{msg} => {e}")
             raise TypeError(msg)
 
+    @instrumented
+    def iter_items(
+        self,
+        query: Optional[Union[dict, list[dict]]] = None,
+        page_size: int = 1000,
+        fields: Optional[Iterable[str]] = None,
+        start_after: Optional[str] = None,
+    ) -> Iterator[dict]:
+        """Lazily iterates over every record in the Deta Base, page by page.
+
+        Unlike `get_all()`, the fetch cursor is followed until the last page,
+        so records beyond the first 1000 (or 1MB) are also returned. Only one
+        page is held in memory at a time.
+
+        ### Args:
+            *   `query (Optional[dict | list[dict]])`: Deta query filters, evaluated
+                by the server. A dict is an AND of its conditions, a list of dicts
+                is an OR of them.
+            *   `page_size (int)`: Maximum number of records requested per round trip.
+            *   `fields (Optional[Iterable[str]])`: Projection; only the `key` and these fields
+                (dotted paths keep their top-level field) are returned and decompressed.
+            *   `start_after (Optional[str])`: Cursor (a key) to resume after, as returned by a fetch.
+
+        ### Yields:
+            The records matching the query, or `TypeError` if a page can not be fetched.
+
+        ### Example:
+            >>> for user in db.iter_items({"age?gte": 18}):
+            ...     print(user["name"])
+        """
+
+        for res in self._pages(query, page_size, "iter_items", start_after):
+            yield from self._present(res.items, fields)
+
+    def _present(self, records: list, fields: Optional[Iterable[str]]) -> Iterator[dict]:
+        """Decodes fetched records, and projects them on `fields` when given."""
+
+        tops = None if fields is None else {field.split(".", 1)[0] for field in fields}
+        for record in records:
+            if self.codec is not None:
+                record = self.codec.decode(record, tops)
+            yield record if fields is None else project(record, fields)
+
+    @instrumented
+    def stream_items(
+        self,
+        query: Optional[Union[dict, list[dict]]] = None,
+        format: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None,
+        page_size: int = 1000,
+    ):
+        """Returns a Flask `Response` streaming the records of a query as a JSON array or NDJSON.
+
+        Records are serialized while the following pages are still being fetched, so the
+        first bytes leave early and the whole collection is never held in memory. The first
+        page is fetched before returning, so errors are raised in the view.
+
+        ### Args:
+            *   `query (Optional[dict | list[dict]])`: Deta query filters, evaluated by the server.
+            *   `format (Optional[str])`: `"json"` (an array) or `"ndjson"` (one record per line).
+                Defaults to the best match of the request `Accept` header, JSON otherwise.
+            *   `limit (Optional[int])`: Paginate: at most this many records (and at most 1000, or 1MB)
+                are sent, from a single fetch, with a `Link: <...?cursor=...>; rel="next"` header
+                (and `X-Next-Cursor`) when more records follow.
+            *   `cursor (Optional[str])`: Cursor of the page to send, e.g. `request.args.get("cursor")`.
+            *   `fields (Optional[Iterable[str]])`: Projection, as in `iter_items()`.
+            *   `page_size (int)`: Records requested per round trip when `limit` is not given.
+
+        ### Returns:
+            A streamed Flask `Response`, or `TypeError` if the records can not be fetched.
+
+        ### Example:
+            >>> @app.route("/users")
+            >>> def users():
+            ...     return db.stream_items(
+            ...         {"active": True}, limit=100, cursor=request.args.get("cursor")
+            ...     )
+        """
+
+        format = format or negotiate_format()
+        if format not in FORMATS:
+            msg = f"Error in 'DetaBase.stream_items()'. Unknown format '{format}', expected one of {tuple(FORMATS)}."
+            current_app.logger.error(msg)
+            raise TypeError(msg)
+
+        if limit is not None:
+            if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1:
+                msg = "Error in 'DetaBase.stream_items()'. The limit must be a positive integer."
+                current_app.logger.error(msg)
+                raise TypeError(msg)
+            res = next(self._pages(query, min(limit, 1000), "stream_items", cursor))
+            return stream_records(self._present(res.items, fields), format, next_cursor=res.last)
+
+        records = self.iter_items(query, page_size, fields, cursor)
+        first = next(records, None)
+        if first is None:
+            return stream_records([], format)
+        return stream_records(itertools.chain([first], records), format)
+
+    @instrumented
+    def count(self, query: Optional[Union[dict, list[dict]]] = None, page_size: int = 1000) -> int:
+        """Counts the records matching a query, page by page, without decoding them.
+
+        ### Args:
+            *   `query (Optional[dict | list[dict]])`: Deta query filters, evaluated by the server.
+            *   `page_size (int)`: Maximum number of records requested per round trip.
+
+        ### Returns:
+            The number of matching records, or `TypeError` if a page can not be fetched.
+
+        ### Example:
+            >>> adults = db.count({"age?gte": 18})
+        """
+
+        return sum(res.count for res in self._pages(query, page_size, "count"))
+
+    @instrumented
+    def sum(self, field: str, query: Optional[Union[dict, list[dict]]] = None, page_size: int = 1000):
+        """Sums the numeric values of a field over the records matching a query.
+
+        The fetch cursor is followed page by page and the values are folded incrementally,
+        so memory stays constant whatever the number of records. Missing and non-numeric
+        values are skipped.
+
+        ### Args:
+            *   `field (str)`: The field to sum; dotted paths reach nested fields.
+            *   `query (Optional[dict | list[dict]])`: Deta query filters, evaluated by the server.
+            *   `page_size (int)`: Maximum number of records requested per round trip.
+
+        ### Returns:
+            The sum (0 when no record matches), or `TypeError` if a page can not be fetched.
+
+        ### Example:
+            >>> revenue = db.sum("total", {"status": "paid"})
+        """
+
+        return self._fold("sum", field, query, page_size)
+
+    @instrumented
+    def min(self, field: str, query: Optional[Union[dict, list[dict]]] = None, page_size: int = 1000):
+        """Returns the smallest value (number or string) of a field over the records matching a query,
+        or None when no record has it. See `sum()`.
+
+        ### Example:
+            >>> cheapest = db.min("price", {"category": "books"})
+        """
+
+        return self._fold("min", field, query, page_size)
+
+    @instrumented
+    def max(self, field: str, query: Optional[Union[dict, list[dict]]] = None, page_size: int = 1000):
+        """Returns the largest value (number or string) of a field over the records matching a query,
+        or None when no record has it. See `sum()`.
+
+        ### Example:
+            >>> last_login = db.max("last_login", {"active": True})
+        """
+
+        return self._fold("max", field, query, page_size)
+
+    @instrumented
+    def group_by(
+        self,
+        by: str,
+        query: Optional[Union[dict, list[dict]]] = None,
+        field: Optional[str] = None,
+        func: str = "count",
+        page_size: int = 1000,
+    ) -> dict:
+        """Aggregates the records matching a query by the values of a field.
+
+        The fetch cursor is followed page by page and each group is folded incrementally,
+        so memory grows with the number of groups, not of records.
+
+        ### Args:
+            *   `by (str)`: The field whose values define the groups (missing values form the `None` group).
+            *   `query (Optional[dict | list[dict]])`: Deta query filters, evaluated by the server.
+            *   `field (Optional[str])`: The field aggregated in each group; not needed for `"count"`.
+            *   `func (str)`: `"count"`, `"sum"`, `"avg"`, `"min"` or `"max"`.
+            *   `page_size (int)`: Maximum number of records requested per round trip.
+
+        ### Returns:
+            A dict mapping each group value to its aggregate, or `TypeError` if the arguments
+            are invalid or a page can not be fetched.
+
+        ### Example:
+            >>> db.group_by("status")
+            {'paid': 120, 'pending': 8}
+            >>> db.group_by("country", {"status": "paid"}, field="total", func="sum")
+            {'MX': 5320.5, 'US': 18200.0}
+        """
+
+        if func not in AGGREGATES or (func != "count" and not field):
+            msg = f"Error in 'DetaBase.group_by()'. Expected func in {AGGREGATES} and a field to aggregate."
+            current_app.logger.error(msg)
+            raise TypeError(msg)
+
+        fields = [by] + ([field] if field else [])
+        return fold_groups(self.iter_items(query, page_size, fields=fields), by, func, field)
+
+    def _fold(self, func: str, field: str, query, page_size: int):
+        try:
+            return fold(self.iter_items(query, page_size, fields=[field]), func, field)
+        except TypeError as e:
+            msg = f"Error in 'DetaBase.{func}()' while aggregating '{field}' => {e}"
+            current_app.logger.error(msg)
+            raise TypeError(msg)
+
+    def _pages(self, query, page_size: int, method: str, last: Optional[str] = None):
+        """Yields the fetch responses of a query, following the cursor until the last page."""
+
+        while True:
+            try:
+                res = self.instance.fetch(query=query, limit=page_size, last=last)
+            except Exception as e:
+                msg = f"Error in 'DetaBase.{method}()' while retrieving data from the database."
+                current_app.logger.error(f"{msg} => {e}")
+                raise TypeError(msg)
+
+            yield res
+
+            last = res.last
+            if not last:
+                break
+
+    @instrumented
     def update(
         self,
         key: str,
@@ -241,12 +808,23 @@ class DetaBase:
             >>> db.update(key=id_key, updates=update, expire_in=expire_in)
         """
 
+        encoded = updates
+        if self.codec is not None:
+            try:
+                encoded = self.codec.encode_updates(updates)
+            except ValueError as e:
+                msg = f"Error in 'DetaBase.update()' while updating record '{key}' => {e}"
+                current_app.logger.error(msg)
+                raise TypeError(msg)
+
         try:
             crud = self.instance.update(
-                updates=updates, key=key, expire_in=expire_in, expire_at=expire_at
+                updates=encoded,
+                key=key,
+                expire_in=expire_in,
+                expire_at=expire_at,
             )
-            return crud
-
+            self._forget(key)
         except:
             msg = f"""Error in 'DetaBase.update()' while updating record '{key}'. This could be due to:
             - The provided key does not correspond to an existing record.
@@ -258,6 +836,10 @@ class DetaBase:
             current_app.logger.error(msg)
             raise TypeError(msg)
 
+        self._reindex(key, updates)
+        return crud
+
+    @instrumented
     def delete(self, key: str):
         """Deletes data from the Deta BASE database using the provided key.
 
@@ -273,9 +855,345 @@ class DetaBase:
         """
 
         crud = self.instance.delete(key)
+        self._forget(key)
+        if self.index is not None:
+            self.index.remove([key])
         if crud:
             return crud
         else:
             msg = f"Error in 'DetaBase.delete()' while deleting '{key}'. Record not found due to incorrect identification key."
             current_app.logger.error(msg)
             raise TypeError(msg)
+
+    @instrumented
+    def flush(self):
+        """Blocks until every buffered `put()` has been written, when the write-behind buffer is enabled.
+
+        ### Example:
+            >>> db.put({"event": "login"})
+            >>> db.flush()
+        """
+
+        if self.write_behind is not None:
+            self.write_behind.flush()
+
+    def _put_behind(self, data, key, expire_in, expire_at) -> dict:
+        try:
+            item = dict(data) if isinstance(data, dict) else {"value": data}
+            if key:
+                item["key"] = key
+            item.setdefault("key", uuid.uuid4().hex)
+            expires = expiration(expire_in, expire_at)
+            if expires is not None:
+                item["__expires"] = expires
+            self.write_behind.enqueue(self.codec.encode(item) if self.codec is not None else item)
+        except Exception as e:
+            msg = "Error in 'DetaBase.put()' while buffering data for the database."
+            current_app.logger.error(f"{msg} => {e}")
+            raise TypeError(f"{msg} => {e}")
+
+        self._forget(item["key"])
+        return item
+
+    def _flush_items(self, items: list[dict]):
+        """Writes a batch of the write-behind buffer; runs in its background thread."""
+
+        for batch in chunked(items, PUT_MANY_LIMIT):
+            res = self._worker_instance().put_many(items=batch)
+            failed = res.get("failed", {}).get("items", [])
+            if failed:
+                raise TypeError(f"{len(failed)} items were rejected by the database")
+            written = res.get("processed", {}).get("items", [])
+            # A get() before the flush may have cached the previous value.
+            self._refresh_cached(written)
+            if self.index is not None:
+                self.index.write(written)
+
+    @instrumented
+    def delete_many(
+        self,
+        keys: Optional[Iterable[str]] = None,
+        query: Optional[Union[dict, list[dict]]] = None,
+        max_workers: Optional[int] = None,
+    ) -> dict:
+        """Deletes multiple records from the Deta Base database.
+
+        The Deta service deletes one record per call, so the deletions are sent
+        concurrently over a bounded thread pool. Instead of keys, a `query` selects
+        the records to delete (`{}` selects every record).
+
+        ### Args:
+            *   `keys (Iterable[str])`: (Optional) The keys of the records to be deleted.
+            *   `query (dict | list[dict])`: (Optional) Deta query filters selecting the records to be deleted.
+            *   `max_workers (int)`: (Optional) Number of deletions sent at once. Defaults to
+                `app.config['BASE_MAX_WORKERS']` or 4.
+
+        ### Returns:
+            A dict whit the deleted and the failed keys, `{"deleted": [...], "failed": {key: reason}}`,
+            or `TypeError` if neither keys nor a query were provided.
+
+        ### Example:
+            >>> db.delete_many(["1122334455", "5544332211"])
+            >>> db.delete_many(query={"status": "expired"})
+        """
+
+        if keys is None and query is None:
+            msg = "Error in 'DetaBase.delete_many()' while deleting records. Keys or a query must be provided."
+            current_app.logger.error(msg)
+            raise TypeError(msg)
+        if isinstance(keys, str) or (keys is not None and not isinstance(keys, Iterable)):
+            msg = "Error in 'DetaBase.delete_many()' while deleting records. Keys must be an iterable."
+            current_app.logger.error(msg)
+            raise TypeError(msg)
+
+        if keys is None:
+            keys = (record["key"] for record in self.iter_items(query=query or None))
+
+        def delete_key(key):
+            return self._worker_instance().delete(key)
+
+        deleted, failed = [], {}
+        for key, _, error in run_batches(delete_key, keys, max_workers or self.max_workers):
+            if error is not None:
+                failed[key] = str(error)
+            else:
+                deleted.append(key)
+            self._forget(key)
+
+        if self.index is not None:
+            self.index.remove(deleted)
+        if failed:
+            current_app.logger.error(
+                f"Error in 'DetaBase.delete_many()' while deleting {len(failed)} records."
+            )
+        return {"deleted": deleted, "failed": failed}
+
+    @instrumented
+    def rebuild_indexes(
+        self, fields: Optional[Iterable[str]] = None, prune: bool = False
+    ) -> dict:
+        """Backfills the secondary indexes from every record of the Deta Base.
+
+        The records are read page by page and their entries written in concurrent batches, so
+        memory stays bounded except for the set of keys kept when `prune` is set. Also available
+        from the command line as `flask deta rebuild-indexes`.
+
+        ### Args:
+            * `fields (Iterable[str])`: (Optional) Indexed fields to rebuild. Defaults to all of them.
+            * `prune (bool)`: (Optional) Also delete entries of removed records and of fields that are no longer indexed.
+
+        ### Returns:
+            * A dict with the number of `indexed` records and `pruned` entries, or `TypeError`
+                if the Base has no indexes.
+
+        ### Example:
+            >>> db.rebuild_indexes()
+            {'indexed': 1520, 'pruned': 0}
+        """
+
+        if self.index is None:
+            msg = "Error in 'DetaBase.rebuild_indexes()'. The Base has no indexed fields."
+            current_app.logger.error(msg)
+            raise TypeError(msg)
+
+        fields = list(fields or self.indexes)
+        unknown = set(fields) - set(self.indexes)
+        if unknown:
+            msg = f"Error in 'DetaBase.rebuild_indexes()'. The fields {sorted(unknown)} are not indexed."
+            current_app.logger.error(msg)
+            raise TypeError(msg)
+
+        seen = set()
+
+        def records():
+            for record in self.iter_items():
+                if prune:
+                    seen.add(record["key"])
+                yield record
+
+        indexed = self.index.write(records(), fields)
+
+        pruned = 0
+        if prune:
+            pruned = self.index.delete_entries(
+                [
+                    entry["key"]
+                    for entry in self.index.iter_entries()
+                    if entry.get("ref") not in seen or entry.get("field") not in self.indexes
+                ]
+            )
+
+        return {"indexed": indexed, "pruned": pruned}
+
+    @instrumented
+    def export_ndjson(
+        self,
+        target: Union[str, os.PathLike, IO],
+        query: Optional[Union[dict, list[dict]]] = None,
+        page_size: int = 1000,
+    ) -> int:
+        """Exports the records of the Base to an NDJSON file (one JSON record per line).
+
+        The records are streamed page by page, decompressed, with their `key` and
+        `__expires`, so only one page is held in memory whatever the size of the Base.
+
+        ### Args:
+            *   `target (str | PathLike | IO)`: Path of the file, gzipped when it ends with
+                `.gz`, or an open text or binary file object (left open).
+            *   `query (Optional[dict | list[dict]])`: Deta query filters of the exported records.
+            *   `page_size (int)`: Maximum number of records requested per round trip.
+
+        ### Returns:
+            The number of exported records, or `TypeError` if a page can not be fetched.
+
+        ### Example:
+            >>> db.export_ndjson("backup/users.ndjson.gz")
+            1520
+        """
+
+        with open_ndjson(target, "w") as file:
+            return write_ndjson(self.iter_items(query, page_size), file)
+
+    @instrumented
+    def import_ndjson(
+        self,
+        source: Union[str, os.PathLike, IO],
+        max_workers: Optional[int] = None,
+    ) -> dict:
+        """Imports the records of an NDJSON file, as written by `export_ndjson()`.
+
+        Lines are read lazily and stored in concurrent batches of 25, like `put_all()`,
+        but only counted, so memory stays constant whatever the size of the file.
+        Records with a `key` replace the stored ones; the others get a generated key.
+
+        ### Args:
+            *   `source (str | PathLike | IO)`: Path of the file, gzipped when it ends with
+                `.gz`, or an open text or binary file object (left open).
+            *   `max_workers (Optional[int])`: Number of batches sent at once. Defaults to
+                `app.config['BASE_MAX_WORKERS']` or 4.
+
+        ### Returns:
+            A dict whit the number of imported and failed records, `{"imported": int, "failed": int}`,
+            or `TypeError` if the file is not valid NDJSON.
+
+        ### Example:
+            >>> db.import_ndjson("backup/users.ndjson.gz")
+            {'imported': 1520, 'failed': 0}
+        """
+
+        imported = failed = 0
+        try:
+            with open_ndjson(source, "r") as file:
+                for written, rejected in self._put_batches(
+                    read_ndjson(file), None, None, max_workers, "import_ndjson"
+                ):
+                    imported += len(written)
+                    failed += len(rejected)
+        except ValueError as e:
+            msg = f"Error in 'DetaBase.import_ndjson()' after {imported + failed} records => {e}"
+            current_app.logger.error(msg)
+            raise TypeError(msg)
+
+        return {"imported": imported, "failed": failed}
+
+    def _reindex(self, key: str, updates: dict):
+        """Refreshes the index entries of the fields touched by `update()`.
+
+        Plain values are indexed as they are; other updates (increments, appends, nested
+        paths...) are resolved by reading the updated record.
+        """
+
+        if self.index is None:
+            return
+
+        touched = [
+            field
+            for field in self.indexes
+            if any(path == field or path.startswith(f"{field}.") for path in updates)
+        ]
+        if not touched:
+            return
+
+        if all(
+            field in updates and (updates[field] is None or isinstance(updates[field], INDEXABLE_TYPES))
+            for field in touched
+        ):
+            record = {"key": key, **{field: updates[field] for field in touched}}
+        else:
+            try:
+                record = self._worker_instance().get(key)
+            except Exception as e:
+                current_app.logger.error(
+                    f"Error in 'DetaBase.update()' while refreshing the indexes of '{key}' => {e}"
+                )
+                return
+            if not record:
+                return
+
+        self.index.write([record], touched)
+
+    def _decode(self, record):
+        """Returns a copy of a stored record, with its compressed values decoded."""
+
+        if not isinstance(record, dict):
+            return record
+        record = dict(record)
+        return self.codec.decode(record) if self.codec is not None else record
+
+    def _refresh_cached(self, records: list[dict], expiring: bool = False):
+        """Refreshes the cached copy of freshly written records.
+
+        Records stored with an expiration are only invalidated, so the cache never
+        outlives them.
+        """
+
+        for record in records:
+            if not isinstance(record, dict) or "key" not in record:
+                continue
+            if self.cache is None or expiring or "__expires" in record:
+                self._forget(record["key"])
+            else:
+                self.cache.set(record["key"], record)
+                self._identity().pop(record["key"], None)
+
+    def _cacheable(self, record) -> bool:
+        """Whether a fetched record can be cached: not when it expires before the cache entry."""
+
+        expires = record.get("__expires") if isinstance(record, dict) else None
+        return expires is None or expires > time.time() + self.cache.ttl
+
+    def _forget(self, key: str):
+        """Drops a key from the cache and from the identity map of the current request."""
+
+        if self.cache is not None:
+            self.cache.invalidate(key)
+        self._identity().pop(key, None)
+
+    def _identity(self) -> dict:
+        """Returns the identity map of the current request, or an empty throwaway dict."""
+
+        if not self.identity_map or not has_request_context():
+            return {}
+        return g.setdefault("_flask_deta_identity", {}).setdefault(self.name, {})
+
+    def _worker_instance(self):
+        """Returns a Base instance bound to the current thread, for bulk operations.
+
+        Instances attached to the shared transport, and local ones, are thread-safe and used as they are.
+        """
+
+        if self.transport is not None or self.backend is not None:
+            return self.instance
+
+        instance = getattr(self._local, "instance", None)
+        if instance is None:
+            instance = build_instance(
+                self.project_key,
+                self.name,
+                self.host,
+                "Base",
+                metrics=self.metrics,
+                resilience=self.resilience,
+            )
+            self._local.instance = instance
+        return instance
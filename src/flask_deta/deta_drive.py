@@ -1,7 +1,74 @@
 import io
-from typing import Optional, Union
-
-from .validator import verify_setups
+import itertools
+import mimetypes
+import os
+import posixpath
+import threading
+import time
+from typing import Iterable, Iterator, Optional, Union
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+
+from flask import Response, current_app, request
+from flask import send_file as flask_send_file
+from werkzeug.http import dump_options_header, parse_content_range_header
+
+from .batching import chunked, run_batches
+from .cache import disk_cache_from_config
+from .cli import register_cli
+from .local import backend_from_config
+from .metrics import instrumented, metrics_from_config
+from .resilience import resilience_from_config
+from .sync import MANIFEST_NAME, dump_manifest, load_manifest, plan_sync, scan_directory
+from .transport import HTTPTransport, transport_from_config
+from .validator import build_instance, check_connection, verify_setups
+
+# Maximum number of names accepted by a single `delete_many` call of the Deta service.
+DELETE_MANY_LIMIT = 1000
+
+
+def _body_header(body, header: str) -> Optional[str]:
+    """Reads a header of the HTTP response wrapped by a Drive streaming body, if available."""
+
+    stream = getattr(body, "_DriveStreamingBody__stream", body)
+    getheader = getattr(stream, "getheader", None)
+    return getheader(header) if getheader else None
+
+
+def _iter_parts(source, part_size: int) -> Iterator[tuple[int, bytes]]:
+    """Reads a binary or text stream incrementally and yields numbered parts of `part_size` bytes."""
+
+    number = 0
+    while True:
+        part = bytearray()
+        while len(part) < part_size:
+            chunk = source.read(part_size - len(part))
+            if not chunk:
+                break
+            part += chunk.encode() if isinstance(chunk, str) else chunk
+        if not part:
+            return
+        number += 1
+        yield number, bytes(part)
+        if len(part) < part_size:
+            return
+
+
+def _iter_body(body, start: int, stop: Optional[int], chunk_size: int) -> Iterator[bytes]:
+    """Yields the `[start, stop)` byte window of a streaming body in chunks and closes it."""
+
+    try:
+        position = 0
+        while stop is None or position < stop:
+            size = chunk_size if stop is None else min(chunk_size, stop - position)
+            chunk = body.read(size)
+            if not chunk:
+                break
+            if position + len(chunk) > start:
+                yield chunk[max(start - position, 0):]
+            position += len(chunk)
+    finally:
+        body.close()
 
 
 class DetaDrive:
@@ -31,41 +98,135 @@ class DetaDrive:
                     the requests will be sent. The default Deta host URL will be used.
                     `host = "https://drive.deta.sh"` -> app.config['DRIVE_HOST']
 
+        * `file_cache (DiskCache | None)`: Optional disk cache of downloaded files, enabled with
+                    `app.config['DRIVE_CACHE_DIR']`, whose files expire after `app.config['DRIVE_CACHE_TTL']`.
+                    Its `stats()` exposes hit, miss, eviction and expiration counters.
+
+        * `part_size (int)`: Size in bytes of each part sent by `put_large_file()`.
+                    `app.config['DRIVE_UPLOAD_PART_SIZE']`, 10MB by default.
+
+        * `max_workers (int)`: Number of parts or batches sent at once by bulk operations.
+                    `app.config['DRIVE_MAX_WORKERS']`, 4 by default.
+
 
     ### Methods:
         * `init_app(app: Flask)`: Initializes the extension and binds it to a Flask application instance.
 
+        * `health_check()`: Tests the connection to the Deta Drive; deferred to first use when `app.config['DETA_LAZY_INIT']` is set.
+
         * `all_files(limit: int=1000, prefix: str=None)`: Gets all files stored on the Deta drive. By default it returns 1000 or 1MB.
 
+        * `iter_files(prefix: str=None, start_after: str=None, page_size: int=1000)`: Lazily iterates over
+            the names of every file on the Deta drive, following the pagination cursor.
+
         * `get_file(name: str)`: Fetches a specific file from the Deta Drive.
 
+        * `send_file(name: str, mimetype: str=None, as_attachment: bool=False, download_name: str=None, chunk_size: int=65536)`:
+            Streams a file from the Deta Drive to the client, with HTTP Range support.
+
         * `put_file(name: str, data: dict[str|bytes|io.TextIOBase|io.BufferedIOBase|io.RawIOBase] = None, path: str = None, type: str = None): `
             Saves a file in the Deta Cloud Drive.
 
+        * `put_large_file(name: str, data: str|bytes|io.IOBase = None, path: str = None, type: str = None, part_size: int = None, max_workers: int = None, retries: int = 3)`:
+            Uploads a large file in parts read incrementally and sent concurrently.
+
         * `delete_file(name: str)`:Removes a file from the Deta Drive.
 
-        * `delete_many(names: str)`: Remove multiple files from the Deta Drive..
+        * `delete_many(names: Iterable[str] = None, prefix: str = None, max_workers: int = None)`:
+            Remove any number of files from the Deta Drive, in concurrent batches of 1000.
+
+        * `sync_dir(directory: str, prefix: str = "", delete: bool = True, dry_run: bool = False, max_workers: int = None)`:
+            Uploads the new and modified files of a local directory and deletes the removed ones.
     """
 
     def __init__(self, app=None, project_key=None, name=None, host=None):
         self.project_key = project_key
         self.name = name
         self.host = host
+        self.lazy = False
+        self._instance = None
+        self._verified = False
+        self.transport = None
+        self.backend = None
+        self.metrics = None
+        self.resilience = None
+        self.file_cache = None
+        self.cache_max_age = None
+        self.part_size = 10 * 1024 * 1024
+        self.max_workers = 4
+        self._range_instance = None
+        self._local = threading.local()
 
         if app is not None:
             self.init_app(app)
 
     def init_app(self, app):
         self.project_key = app.config.get("DETA_PROJECT_KEY", self.project_key)
-        self.name = app.config.get("DRIVE_NAME", self.name)
+        self.name = self.name or app.config.get("DRIVE_NAME")
         self.host = app.config.get("DRIVE_HOST", self.host)
-
-        self.instance = verify_setups(self.project_key, self.name, self.host, "Drive")
+        self.file_cache = disk_cache_from_config(app.config, "DRIVE")
+        self.cache_max_age = app.config.get("DRIVE_CACHE_MAX_AGE")
+        self.part_size = app.config.get("DRIVE_UPLOAD_PART_SIZE", self.part_size)
+        self.max_workers = app.config.get("DRIVE_MAX_WORKERS", self.max_workers)
+        self._range_instance = None
+
+        self.lazy = app.config.get("DETA_LAZY_INIT", False)
+        self.transport = transport_from_config(app)
+        self.backend = backend_from_config(app)
+        self.metrics = metrics_from_config(app)
+        self.resilience = resilience_from_config(app, self.transport)
+        self._instance = verify_setups(
+            self.project_key,
+            self.name,
+            self.host,
+            "Drive",
+            lazy=self.lazy,
+            transport=self.transport,
+            client=self.backend,
+            metrics=self.metrics,
+            resilience=self.resilience,
+        )
+        self._verified = not self.lazy
+        register_cli(app)
 
         if not hasattr(app, "extensions"):
             app.extensions = {}
-        app.extensions["flask_deta"] = {"drive": self.instance}
+        extension = app.extensions.setdefault("flask_deta", {})
+        extension["drive"] = self._instance
+        extension.setdefault("drives", {})[self.name] = self
+
+    @property
+    def instance(self):
+        """The underlying Deta Drive instance. In lazy mode, the connection is tested on first use."""
 
+        if self._instance is None:
+            raise TypeError(
+                ">>> ERROR in DetaDrive ==> The extension has not been initialized with init_app()"
+            )
+        if not self._verified:
+            self.health_check()
+        return self._instance
+
+    @instance.setter
+    def instance(self, instance):
+        self._instance = instance
+        self._verified = True
+
+    @instrumented
+    def health_check(self) -> bool:
+        """Tests the connection to the Deta Drive.
+
+        Called automatically on first use when `app.config['DETA_LAZY_INIT']` is set.
+
+        ### Returns:
+            True, or `KeyError`/`TypeError` if the key or the connection is wrong.
+        """
+
+        check_connection(self._instance, "Drive")
+        self._verified = True
+        return True
+
+    @instrumented
     def all_files(
         self, limit: Optional[int] = 1000, prefix: Optional[str] = None
     ) -> Optional[list]:
@@ -96,35 +257,305 @@ class DetaDrive:
         except Exception as e:
             raise Exception(f"Error in 'DetaDrive.all_files()' method => {e}")
 
-    def get_file(self, name: str) -> bytes:
+    @instrumented
+    def iter_files(
+        self,
+        prefix: Optional[str] = None,
+        start_after: Optional[str] = None,
+        page_size: int = 1000,
+    ) -> Iterator[str]:
+        """
+        Lazily iterates over the names of every file stored in the Deta Drive.
+
+        The pagination cursor is followed until the last page, so drives with more
+        than 1000 files are listed completely, and names are yielded as each page arrives.
+        An empty drive simply yields nothing.
+
+        ### Args
+            prefix (optional): Prefix that file names must start with to be returned.
+            start_after (optional): Name of a file; only files listed after it are returned.
+            page_size (optional): Maximum number of names requested per round trip.
+
+        ### Yields:
+            str: The name of each file.
+
+        ### Examples:
+        ```python
+        >>> for name in drive.iter_files(prefix="burger"):
+        ...     print(name)
+        ```
+        """
+
+        last = start_after
+        while True:
+            try:
+                files = self.instance.list(limit=page_size, prefix=prefix, last=last)
+            except Exception as e:
+                raise Exception(f"Error in 'DetaDrive.iter_files()' method => {e}")
+
+            yield from files.get("names", [])
+
+            last = files.get("paging", {}).get("last")
+            if not last:
+                break
+
+    @instrumented
+    def get_file(self, name: str):
         """
         Fetches a specific file from the Deta Drive.
 
+        The existence of the file is decided from the download itself, in a single round trip.
+        When the disk cache is enabled, the file is served from (and saved to) the cache and
+        an open binary file object is returned instead.
+
         ### Args:
             `name (str)`: The name of the file to fetch.
 
         ### Returns:
-            The file
+            The file as a streaming body (`read()`, `iter_chunks()`, `close()`) or Exception
+            if the file does not exist or an error occurs.
 
         ### Examples:
         ```python
         >>> descriptions = "descriptions.txt"
-        >>> file_content = drive.get_file(descriptions)
+        >>> file_content = drive.get_file(descriptions).read()
         ```
         """
-        if name:
-            file = self.instance.get(name)
-            if name in set(self.instance.list()["names"]):
-                return file
-            else:
-                raise Exception(
-                    "Error in 'DetaDrive.get_file()' method => 404 File not found"
-                )
-        else:
+        if not name:
             raise Exception(
                 "Error in 'DetaDrive.get_file()' method => The name has not been provided"
             )
 
+        if self.file_cache is not None:
+            entry = self._cached_file(name, "get_file")
+            file = open(entry["path"], "rb")
+            if entry.get("transient"):
+                try:
+                    os.remove(entry["path"])
+                except OSError:
+                    pass
+            return file
+
+        return self._download(name, "get_file")
+
+    def _download(self, name: str, method: str):
+        try:
+            file = self.instance.get(name)
+        except Exception as e:
+            raise Exception(f"Error in 'DetaDrive.{method}()' method => {e}")
+
+        if file is None:
+            raise Exception(
+                f"Error in 'DetaDrive.{method}()' method => 404 File not found"
+            )
+        return file
+
+    def _cached_file(self, name: str, method: str, chunk_size: int = 64 * 1024) -> dict:
+        """Returns the disk cache entry of a file, downloading it on a miss."""
+
+        entry = self.file_cache.lookup(name)
+        if entry is None:
+            body = self._download(name, method)
+            try:
+                entry = self.file_cache.store(
+                    name,
+                    iter(lambda: body.read(chunk_size), b""),
+                    mimetype=_body_header(body, "Content-Type"),
+                )
+            finally:
+                body.close()
+        return entry
+
+    @instrumented
+    def send_file(
+        self,
+        name: str,
+        mimetype: Optional[str] = None,
+        as_attachment: bool = False,
+        download_name: Optional[str] = None,
+        chunk_size: int = 64 * 1024,
+    ) -> Response:
+        """
+        Streams a file from the Deta Drive to the client without buffering it in memory.
+
+        The response carries `Content-Length` and `Content-Type`, and honours single-range
+        HTTP `Range` requests with `206 Partial Content`. The range is forwarded to the Drive,
+        so only the requested bytes are downloaded (skipped locally if the Drive ignores it).
+        When the disk cache is enabled, files are served zero-copy from the cache with a
+        strong `ETag` and `If-None-Match`/`304 Not Modified` handling.
+        Must be called inside a request context.
+
+        ### Args:
+            *   `name (str)`: The name of the file to send.
+
+            *   `mimetype (str, optional)`: The content type of the response. Defaults to the
+                type reported by the Drive or guessed from the file name.
+
+            *   `as_attachment (bool, optional)`: Whether the browser should download the file
+                instead of displaying it. Defaults to False.
+
+            *   `download_name (str, optional)`: File name proposed to the browser. Defaults to
+                the last segment of `name`.
+
+            *   `chunk_size (int, optional)`: Number of bytes read from the Drive per chunk.
+
+        ### Returns:
+            A streamed Flask `Response` or Exception if the file does not exist or an error occurs.
+
+        ### Examples:
+        ```python
+        >>> @app.route("/media/<path:name>")
+        >>> def media(name):
+        ...     return drive.send_file(name)
+        ```
+        """
+
+        if self.file_cache is not None:
+            return self._send_cached(
+                name, mimetype, as_attachment, download_name, chunk_size
+            )
+
+        ranged = request.range is not None and len(request.range.ranges) == 1
+        upstream, body, partial = self._download_range(name) if ranged else (None, None, None)
+        if upstream == 416:
+            return current_app.response_class(status=416, headers={"Content-Range": partial})
+        if body is None:
+            body = self._download(name, "send_file")
+
+        length = _body_header(body, "Content-Length")
+        length = int(length) if length and length.isdigit() else None
+        mimetype = (
+            mimetype
+            or _body_header(body, "Content-Type")
+            or mimetypes.guess_type(name)[0]
+            or "application/octet-stream"
+        )
+
+        headers = {}
+        status = 200
+        start, stop = 0, length
+
+        if partial is not None:
+            # The Drive sent the requested window only.
+            stop = partial.stop - partial.start
+            headers["Accept-Ranges"] = "bytes"
+            headers["Content-Range"] = partial.to_header()
+            headers["Content-Length"] = str(stop)
+            status = 206
+        elif length is not None:
+            headers["Accept-Ranges"] = "bytes"
+            if request.range is not None and len(request.range.ranges) == 1:
+                byte_range = request.range.range_for_length(length)
+                if byte_range is None:
+                    body.close()
+                    return current_app.response_class(
+                        status=416, headers={"Content-Range": f"bytes */{length}"}
+                    )
+                start, stop = byte_range
+                status = 206
+                headers["Content-Range"] = request.range.to_content_range_header(length)
+            headers["Content-Length"] = str(stop - start)
+
+        if as_attachment:
+            headers["Content-Disposition"] = dump_options_header(
+                "attachment", {"filename": download_name or posixpath.basename(name)}
+            )
+
+        return current_app.response_class(
+            _iter_body(body, start, stop, chunk_size),
+            status=status,
+            headers=headers,
+            mimetype=mimetype,
+            direct_passthrough=True,
+        )
+
+    def _download_range(self, name: str):
+        """Downloads the byte range requested by the client, sending the `Range` header upstream.
+
+        Returns `(status, body, content_range)`: the window and its `ContentRange` on 206, the
+        whole body on 200 (range ignored by the Drive), the `Content-Range` header on 416, or
+        `(None, None, None)` when the range can not be sent upstream (local backend), so the
+        caller downloads the file and skips bytes instead.
+        """
+
+        instance = self._ranged_instance()
+        if instance is None:
+            return None, None, None
+
+        try:
+            status, body = instance._request(
+                f"/files/download?{urlencode({'name': name})}",
+                "GET",
+                headers={"Range": request.range.to_header()},
+                stream=True,
+            )
+        except HTTPError as e:
+            content_range = e.headers.get("Content-Range") if e.headers is not None else None
+            if e.code == 416 and content_range:
+                return 416, None, content_range
+            raise Exception(f"Error in 'DetaDrive.send_file()' method => {e}")
+        except Exception as e:
+            raise Exception(f"Error in 'DetaDrive.send_file()' method => {e}")
+
+        if body is None:
+            raise Exception("Error in 'DetaDrive.send_file()' method => 404 File not found")
+        if status != 206:
+            return status, body, None
+
+        partial = parse_content_range_header(_body_header(body, "Content-Range"))
+        if partial is None:
+            body.close()
+            raise Exception("Error in 'DetaDrive.send_file()' method => Invalid Content-Range from the Drive")
+        return status, body, partial
+
+    def _ranged_instance(self):
+        """Returns a Drive instance whose requests accept `206 Partial Content`, or None.
+
+        The Deta SDK rejects partial responses, so without a shared transport ranged downloads
+        go through a private pool of connections; the local backend has no HTTP requests.
+        """
+
+        if self.backend is not None:
+            return None
+        if self.transport is not None:
+            return self.instance
+        if self._range_instance is None:
+            self._range_instance = build_instance(
+                self.project_key,
+                self.name,
+                self.host,
+                "Drive",
+                transport=HTTPTransport(maxsize=self.max_workers),
+                metrics=self.metrics,
+                resilience=self.resilience,
+            )
+        return self._range_instance
+
+    def _send_cached(self, name, mimetype, as_attachment, download_name, chunk_size):
+        entry = self._cached_file(name, "send_file", chunk_size)
+
+        response = flask_send_file(
+            entry["path"],
+            mimetype=(
+                mimetype
+                or entry["mimetype"]
+                or mimetypes.guess_type(name)[0]
+                or "application/octet-stream"
+            ),
+            as_attachment=as_attachment,
+            download_name=(
+                (download_name or posixpath.basename(name)) if as_attachment else None
+            ),
+            etag=entry["etag"],
+            conditional=True,
+            max_age=self.cache_max_age,
+        )
+
+        if entry.get("transient"):
+            response.call_on_close(lambda: os.remove(entry["path"]))
+        return response
+
+    @instrumented
     def put_file(
         self,
         name: str,
@@ -165,6 +596,8 @@ class DetaDrive:
             to_save = self.instance.put(
                 name=name, data=data, path=path, content_type=type
             )
+            if self.file_cache is not None:
+                self.file_cache.invalidate(name)
             if name:
                 return to_save
             else:
@@ -172,6 +605,125 @@ class DetaDrive:
         except Exception as e:
             raise Exception(f"Error in 'DetaDrive.put_file()' method => {e}")
 
+    @instrumented
+    def put_large_file(
+        self,
+        name: str,
+        data: Union[str, bytes, io.TextIOBase, io.BufferedIOBase, io.RawIOBase] = None,
+        path: Optional[str] = None,
+        type: Optional[str] = None,
+        part_size: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        retries: int = 3,
+    ) -> str:
+        """
+        Uploads a large file to the Deta Drive in parts sent concurrently.
+        IMPORTANT: You must pass either `data` or `path` but not both, otherwise an error will be generated.
+
+        The source is read incrementally, so at most `2 * max_workers` parts are held in
+        memory at once. Each failed part is retried with an exponential backoff; if a part
+        still fails the upload is aborted and nothing is saved.
+
+        ### Args:
+            *   `name (str)`: The name of the file to be saved.
+
+            *   `data (str| bytes|io.TextIOBase|io.BufferedIOBase|io.RawIOBase, optional)`:
+                The data content of the file, for example Flask's `request.stream`. Defaults to None.
+
+            *   `path (str, optional)`: The local path of the file to be saved. Defaults to None.
+
+            *   `type (str, optional)`: The content type (MIME style => "type/subtype") of the file. Defaults to None.
+
+            *   `part_size (int, optional)`: Size in bytes of each part. Defaults to
+                `app.config['DRIVE_UPLOAD_PART_SIZE']` or 10MB.
+
+            *   `max_workers (int, optional)`: Number of parts sent at once. Defaults to
+                `app.config['DRIVE_MAX_WORKERS']` or 4.
+
+            *   `retries (int, optional)`: Number of attempts for each part. Defaults to 3.
+
+        ### Returns:
+            The name of the saved file or Exception if an error occurs.
+
+        ### Examples:
+        ```python
+        >>> @app.route("/upload/<name>", methods=["PUT"])
+        >>> def upload(name):
+        ...     return drive.put_large_file(name, data=request.stream, type=request.mimetype)
+        ```
+        """
+
+        if not name:
+            raise Exception("Error in 'DetaDrive.put_large_file()' method => Drive name is not provided")
+        if (data is None) == (path is None):
+            raise Exception(
+                "Error in 'DetaDrive.put_large_file()' method => Please provide data or a path, but not both"
+            )
+
+        part_size = part_size or self.part_size
+        if isinstance(data, (str, bytes)):
+            source = io.BytesIO(data.encode() if isinstance(data, str) else data)
+        else:
+            source = data if path is None else open(path, "rb")
+
+        try:
+            parts = _iter_parts(source, part_size)
+            first = next(parts, (1, b""))
+            second = next(parts, None)
+            if second is None:
+                return self.put_file(name, data=first[1], type=type)
+
+            return self._upload_parts(
+                name, [first, second], parts, type, max_workers or self.max_workers, retries
+            )
+        finally:
+            if path is not None:
+                source.close()
+
+    def _upload_parts(self, name, head, parts, type, max_workers, retries) -> str:
+        try:
+            upload_id = self.instance._start_upload(name)
+        except Exception as e:
+            raise Exception(f"Error in 'DetaDrive.put_large_file()' method => {e}")
+
+        def upload_part(part):
+            number, chunk = part
+            for attempt in range(retries):
+                try:
+                    return self._worker_instance()._upload_part(
+                        name, chunk, upload_id, number, content_type=type
+                    )
+                except Exception:
+                    if attempt + 1 >= retries:
+                        raise
+                    time.sleep(0.5 * 2**attempt)
+
+        def all_parts():
+            yield from head
+            yield from parts
+
+        error = None
+        for (number, _), _, error in run_batches(upload_part, all_parts(), max_workers):
+            if error is not None:
+                error = f"part {number} failed => {error}"
+                break
+
+        try:
+            if error is None:
+                self.instance._finish_upload(name, upload_id)
+            else:
+                self.instance._abort_upload(name, upload_id)
+        except Exception as e:
+            error = error or e
+
+        if error is not None:
+            raise Exception(f"Error in 'DetaDrive.put_large_file()' method => {error}")
+
+        if self.file_cache is not None:
+            self.file_cache.invalidate(name)
+        return name
+
+    @instrumented
     def delete_file(self, name: str) -> str:
         """
         Removes a file from the Deta Drive.
@@ -190,6 +742,8 @@ class DetaDrive:
 
         try:
             del_file = self.instance.delete(name)
+            if self.file_cache is not None:
+                self.file_cache.invalidate(name)
             if del_file:
                 return del_file
             else:
@@ -204,26 +758,188 @@ class DetaDrive:
         except Exception as e:
             raise Exception(f"Error in 'DetaDrive.delete_file()' method => {e}")
 
-    def delete_many(self, names: list[str]):
+    @instrumented
+    def delete_many(
+        self,
+        names: Optional[Iterable[str]] = None,
+        prefix: Optional[str] = None,
+        max_workers: Optional[int] = None,
+    ) -> dict:
         """
         Remove multiple files from the Deta Drive.
 
-        This method allows you to remove multiple files from the Deta Drive at once.
+        The names are split into batches of 1000 (the service limit per call), which are
+        sent concurrently over a bounded thread pool. Instead of names, a `prefix` selects
+        every file whose name starts with it.
 
         ### Args:
-            names (list[str]): A list of names of the files to be removed.
+            names (Iterable[str], optional): The names of the files to be removed.
+            prefix (str, optional): Remove every file whose name starts with this prefix.
+            max_workers (int, optional): Number of batches sent at once. Defaults to
+                `app.config['DRIVE_MAX_WORKERS']` or 4.
 
-        - Returns the names of the removed files or Exeption if the file does not exist or an error occurs.
+        - Returns a dict whit the removed and the failed files, `{"deleted": [...], "failed": {name: reason}}`,
+          or Exeption if neither names nor a prefix were provided.
 
         ### Examples:
             >>> files_to_remove = ["example.txt", "data.csv"]
             >>> drive.delete_many(files_to_remove)
+            >>> drive.delete_many(prefix="tmp/")
         """
-        
-        try:
-            if isinstance(names, list):
-                return self.instance.delete_many(names)
+
+        if names is None and prefix is None:
+            raise Exception(
+                "Error in 'DetaDrive.delete_many()' method => Names or a prefix must be provided"
+            )
+        if isinstance(names, str) or (names is not None and not isinstance(names, Iterable)):
+            raise Exception(
+                "Error in 'DetaDrive.delete_many()' method => Names must be an iterable of file names"
+            )
+
+        if names is None:
+            names = self.iter_files(prefix=prefix)
+        elif prefix is not None:
+            names = (name for name in names if name.startswith(prefix))
+
+        def delete_batch(batch):
+            return self._worker_instance().delete_many(batch)
+
+        deleted, failed = [], {}
+        for batch, res, error in run_batches(
+            delete_batch,
+            chunked(names, DELETE_MANY_LIMIT),
+            max_workers or self.max_workers,
+        ):
+            if error is not None:
+                failed.update({name: str(error) for name in batch})
             else:
-                raise ValueError("List of names has not been provided or is not a list")
+                deleted.extend(res.get("deleted", []))
+                failed.update(res.get("failed", {}))
+
+            if self.file_cache is not None:
+                for name in batch:
+                    self.file_cache.invalidate(name)
+
+        return {"deleted": deleted, "failed": failed}
+
+    @instrumented
+    def sync_dir(
+        self,
+        directory: str,
+        prefix: str = "",
+        delete: bool = True,
+        dry_run: bool = False,
+        max_workers: Optional[int] = None,
+        manifest: str = MANIFEST_NAME,
+    ) -> dict:
+        """
+        Synchronizes a local directory to the Deta Drive, sending only what changed.
+
+        A manifest of the synced files (name, size and SHA-256) is kept in the Drive, so new and
+        modified files are found without downloading or listing anything else. They are uploaded
+        concurrently (files larger than `part_size` in parts, with `put_large_file()`), and files
+        removed locally are deleted. Failed uploads keep their previous manifest entry, so they
+        are retried by the next sync.
+
+        ### Args:
+            *   `directory (str)`: The local directory, synced recursively.
+
+            *   `prefix (str, optional)`: Prefix of the file names in the Drive, e.g. `"static/"`.
+
+            *   `delete (bool, optional)`: Delete the files of a previous sync missing locally. Defaults to True.
+
+            *   `dry_run (bool, optional)`: Only report what would be uploaded and deleted. Defaults to False.
+
+            *   `max_workers (int, optional)`: Number of files sent at once. Defaults to
+                `app.config['DRIVE_MAX_WORKERS']` or 4.
+
+            *   `manifest (str, optional)`: Name of the manifest, stored under `prefix`.
+
+        ### Returns:
+            A dict whit the names of the `uploaded`, `deleted` and `unchanged` files, and the
+            `failed` ones with their reason, or Exception if the directory or the manifest can not be read.
+
+        ### Examples:
+            >>> drive.sync_dir("build/assets", prefix="assets/")
+            {'uploaded': ['assets/app.js'], 'deleted': [], 'unchanged': ['assets/logo.png'], 'failed': {}}
+        """
+
+        if not os.path.isdir(directory):
+            raise Exception(f"Error in 'DetaDrive.sync_dir()' method => '{directory}' is not a directory")
+
+        manifest_name = prefix + manifest
+        try:
+            body = self.instance.get(manifest_name)
+            try:
+                remote = load_manifest(body.read() if body is not None else None)
+            finally:
+                if body is not None:
+                    body.close()
+        except Exception as e:
+            raise Exception(f"Error in 'DetaDrive.sync_dir()' method => can not read the manifest: {e}")
+
+        local = scan_directory(directory, prefix, exclude=[manifest_name])
+        upload, removed, unchanged = plan_sync(local, remote, delete)
+        result = {"uploaded": upload, "deleted": removed, "unchanged": unchanged, "failed": {}}
+        if dry_run or not (upload or removed):
+            return result
+
+        def upload_file(name):
+            entry = local[name]
+            type = mimetypes.guess_type(name)[0]
+            if entry["size"] > self.part_size:
+                # Large files are already sent in concurrent parts.
+                return self.put_large_file(name, path=entry["path"], type=type)
+            return self._worker_instance().put(name=name, path=entry["path"], content_type=type)
+
+        small = [name for name in upload if local[name]["size"] <= self.part_size]
+        large = [name for name in upload if local[name]["size"] > self.part_size]
+        results = run_batches(upload_file, small, max_workers or self.max_workers)
+        results = itertools.chain(results, run_batches(upload_file, large, 1))
+
+        uploaded = []
+        for name, _, error in results:
+            if error is not None:
+                result["failed"][name] = str(error)
+                continue
+            uploaded.append(name)
+            remote[name] = {"sha256": local[name]["sha256"], "size": local[name]["size"]}
+            if self.file_cache is not None:
+                self.file_cache.invalidate(name)
+        result["uploaded"] = sorted(uploaded)
+
+        if removed:
+            res = self.delete_many(removed, max_workers=max_workers)
+            result["deleted"] = res["deleted"]
+            result["failed"].update(res["failed"])
+            for name in res["deleted"]:
+                remote.pop(name, None)
+
+        try:
+            # Not "application/json": the SDK and the transports would JSON-encode the bytes again.
+            self.instance.put(name=manifest_name, data=dump_manifest(remote), content_type="application/octet-stream")
         except Exception as e:
-            raise Exception(f"Error in 'DetaDrive.delete_many()' method => {e}")
+            raise Exception(f"Error in 'DetaDrive.sync_dir()' method => can not save the manifest: {e}")
+        return result
+
+    def _worker_instance(self):
+        """Returns a Drive instance bound to the current thread, for bulk operations.
+
+        Instances attached to the shared transport, and local ones, are thread-safe and used as they are.
+        """
+
+        if self.transport is not None or self.backend is not None:
+            return self.instance
+
+        instance = getattr(self._local, "instance", None)
+        if instance is None:
+            instance = build_instance(
+                self.project_key,
+                self.name,
+                self.host,
+                "Drive",
+                metrics=self.metrics,
+                resilience=self.resilience,
+            )
+            self._local.instance = instance
+        return instance
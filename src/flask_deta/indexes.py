@@ -0,0 +1,157 @@
+import hashlib
+import logging
+import threading
+from typing import Callable, Iterable, Iterator, Optional
+
+from .batching import PUT_MANY_LIMIT, chunked, run_batches
+
+logger = logging.getLogger("flask_deta")
+
+# Types stored as index values; other values (lists, dicts) are indexed as missing.
+INDEXABLE_TYPES = (str, int, float, bool)
+
+
+class SecondaryIndex:
+    """## Class SecondaryIndex
+    Client-maintained index of some fields of a Base, stored in a companion Base.
+
+    Every indexed field of every record has one entry `{"field", "value", "ref"}`, where `ref`
+    is the key of the record. Entry keys are derived from the field and the record key, so
+    rewriting a record overwrites its entries instead of piling up new ones. Missing or
+    non-scalar values are indexed as `None`.
+
+    ### Attributes:
+        * `fields (list[str])`: Indexed top-level fields.
+
+        * `build (Callable[[], Base])`: Builds an instance of the companion Base.
+
+        * `shared (bool)`: Whether a single instance can be shared between threads
+            (shared transport or local backend).
+
+        * `max_workers (int)`: Number of index writes or deletions sent at once.
+    """
+
+    def __init__(self, fields: Iterable[str], build: Callable, shared: bool = False, max_workers: int = 4):
+        self.fields = list(fields)
+        self.build = build
+        self.shared = shared
+        self.max_workers = max_workers
+        self._instance = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def instance(self):
+        """Instance of the companion Base usable from the current thread."""
+
+        if self.shared:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self.build()
+                return self._instance
+
+        instance = getattr(self._local, "instance", None)
+        if instance is None:
+            instance = self._local.instance = self.build()
+        return instance
+
+    @staticmethod
+    def entry_key(field: str, key: str) -> str:
+        return hashlib.sha1(f"{field}\0{key}".encode()).hexdigest()
+
+    def entries(self, record: dict, fields: Optional[Iterable[str]] = None) -> list[dict]:
+        """Returns the index entries of a record."""
+
+        entries = []
+        for field in fields or self.fields:
+            value = record.get(field)
+            entry = {
+                "key": self.entry_key(field, record["key"]),
+                "field": field,
+                "value": value if isinstance(value, INDEXABLE_TYPES) else None,
+                "ref": record["key"],
+            }
+            if "__expires" in record:
+                entry["__expires"] = record["__expires"]
+            entries.append(entry)
+        return entries
+
+    def write(self, records: Iterable[dict], fields: Optional[Iterable[str]] = None) -> int:
+        """Writes the entries of any number of records, and returns the number of records.
+
+        Records are consumed lazily; failed batches are logged and left to `rebuild_indexes`.
+        """
+
+        count = 0
+
+        def entries():
+            nonlocal count
+            for record in records:
+                if isinstance(record, dict) and "key" in record:
+                    count += 1
+                    yield from self.entries(record, fields)
+
+        def put_batch(batch):
+            return self.instance.put_many(items=batch)
+
+        for batch, res, error in run_batches(put_batch, chunked(entries(), PUT_MANY_LIMIT), self.max_workers):
+            failed = error or res.get("failed", {}).get("items")
+            if failed:
+                logger.error(f"Error writing {len(batch)} secondary index entries => {failed}")
+        return count
+
+    def remove(self, keys: Iterable[str]) -> int:
+        """Deletes the entries of the given record keys, and returns the number of entries."""
+
+        return self.delete_entries(self.entry_key(field, key) for key in keys for field in self.fields)
+
+    def delete_entries(self, entry_keys: Iterable[str]) -> int:
+        """Deletes index entries by their own keys, and returns the number of deleted entries."""
+
+        def delete_entry(entry_key):
+            return self.instance.delete(entry_key)
+
+        count = 0
+        for entry_key, _, error in run_batches(delete_entry, entry_keys, self.max_workers):
+            if error is not None:
+                logger.error(f"Error deleting the secondary index entry '{entry_key}' => {error}")
+            else:
+                count += 1
+        return count
+
+    def iter_entries(self, query=None, page_size: int = 1000) -> Iterator[dict]:
+        """Iterates over the entries matching a Deta query, following the fetch cursor."""
+
+        last = None
+        while True:
+            res = self.instance.fetch(query=query, limit=page_size, last=last)
+            yield from res.items
+            last = res.last
+            if not last:
+                break
+
+    def lookup(self, field: str, value, limit: Optional[int] = None) -> list[str]:
+        """Returns the keys of the records whose `field` is indexed with `value`."""
+
+        refs = []
+        page_size = min(limit, 1000) if limit else 1000
+        for entry in self.iter_entries({"field": field, "value": value}, page_size):
+            refs.append(entry["ref"])
+            if limit and len(refs) >= limit:
+                break
+        return refs
+
+
+def indexes_from_config(config, prefix: str, name: str) -> list[str]:
+    """Returns the indexed fields of a Base from the `<prefix>_INDEXES` config key.
+
+    The key is either a list of fields, for the Base named by `<prefix>_NAME`, or a dict
+    mapping Base names to their lists of fields.
+    """
+
+    indexes = config.get(f"{prefix}_INDEXES")
+    if isinstance(indexes, dict):
+        return list(indexes.get(name, []))
+    if indexes and name == config.get(f"{prefix}_NAME"):
+        return list(indexes)
+    return []
@@ -0,0 +1,474 @@
+import io
+import json
+import os
+import secrets
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional
+from urllib.parse import quote, unquote
+
+from .batching import expiration
+
+_MISSING = object()
+
+
+class FetchResponse:
+    """Page of records returned by `LocalBase.fetch`, like the one of the Deta SDK."""
+
+    def __init__(self, count: int = 0, last: Optional[str] = None, items: Optional[list] = None):
+        self.count = count
+        self.last = last
+        self.items = items or []
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, FetchResponse)
+            and (self.count, self.last, self.items) == (other.count, other.last, other.items)
+        )
+
+
+class _Util:
+    """Update operations of `LocalBase.update`, like `Base.util` of the Deta SDK."""
+
+    class Trim:
+        pass
+
+    class Increment:
+        def __init__(self, value=None):
+            self.val = value if value is not None else 1
+
+    class Append:
+        def __init__(self, value):
+            self.val = value if isinstance(value, list) else [value]
+
+    class Prepend:
+        def __init__(self, value):
+            self.val = value if isinstance(value, list) else [value]
+
+    def trim(self):
+        return self.Trim()
+
+    def increment(self, value=None):
+        return self.Increment(value)
+
+    def append(self, value):
+        return self.Append(value)
+
+    def prepend(self, value):
+        return self.Prepend(value)
+
+
+def _get_path(item: dict, path: str):
+    value = item
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _compare(value, op: str, expected) -> bool:
+    if op == "ne":
+        return value is _MISSING or value != expected
+    if value is _MISSING:
+        return op == "not_contains"
+
+    try:
+        if op == "eq":
+            return value == expected
+        if op == "lt":
+            return value < expected
+        if op == "gt":
+            return value > expected
+        if op == "lte":
+            return value <= expected
+        if op == "gte":
+            return value >= expected
+        if op == "pfx":
+            return isinstance(value, str) and value.startswith(expected)
+        if op == "r":
+            return expected[0] <= value <= expected[1]
+        if op == "contains":
+            return isinstance(value, (str, list)) and expected in value
+        if op == "not_contains":
+            return not (isinstance(value, (str, list)) and expected in value)
+    except TypeError:
+        return False
+
+    raise ValueError(f"Unknown query operator '{op}'")
+
+
+def matches(item: dict, query) -> bool:
+    """Evaluates a Deta query on an item: a dict is an AND of conditions, a list an OR of dicts."""
+
+    if not query:
+        return True
+    if isinstance(query, list):
+        return any(matches(item, condition) for condition in query)
+
+    for field, expected in query.items():
+        path, _, op = field.partition("?")
+        if not _compare(_get_path(item, path), op or "eq", expected):
+            return False
+    return True
+
+
+class LocalBase:
+    """## Class LocalBase
+    SQLite-backed stand-in of a Deta SDK Base, with the same methods: `get`, `put`,
+    `insert`, `put_many`, `update`, `delete` and `fetch` (queries, expiry and pagination cursors).
+    """
+
+    def __init__(self, connection: sqlite3.Connection, lock: threading.Lock, name: str):
+        self.name = name
+        self.util = _Util()
+        self._connection = connection
+        self._lock = lock
+
+    def _now(self) -> int:
+        return int(time.time())
+
+    def _row(self, key: str) -> Optional[dict]:
+        row = self._connection.execute(
+            "SELECT value FROM items WHERE base = ? AND key = ? AND (expires IS NULL OR expires > ?)",
+            (self.name, key, self._now()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _write(self, item: dict):
+        self._connection.execute(
+            "INSERT OR REPLACE INTO items (base, key, value, expires) VALUES (?, ?, ?, ?)",
+            (self.name, item["key"], json.dumps(item), item.get("__expires")),
+        )
+
+    @staticmethod
+    def _prepare(data, key=None, expire_in=None, expire_at=None) -> dict:
+        item = dict(data) if isinstance(data, dict) else {"value": data}
+        if key:
+            item["key"] = key
+        if not isinstance(item.setdefault("key", secrets.token_hex(6)), str):
+            raise ValueError("Key must be a string")
+        expires = expiration(expire_in, expire_at)
+        if expires is not None:
+            item["__expires"] = expires
+        return item
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            return self._row(key)
+
+    def put(self, data, key: Optional[str] = None, *, expire_in=None, expire_at=None) -> dict:
+        item = self._prepare(data, key, expire_in, expire_at)
+        with self._lock, self._connection:
+            self._write(item)
+        return item
+
+    def insert(self, data, key: Optional[str] = None, *, expire_in=None, expire_at=None) -> dict:
+        item = self._prepare(data, key, expire_in, expire_at)
+        with self._lock, self._connection:
+            if self._row(item["key"]) is not None:
+                raise Exception(f"Item with key '{item['key']}' already exists")
+            self._write(item)
+        return item
+
+    def put_many(self, items: list, *, expire_in=None, expire_at=None) -> dict:
+        if len(items) > 25:
+            raise AssertionError("We can't put more than 25 items at a time.")
+        prepared = [self._prepare(item, None, expire_in, expire_at) for item in items]
+        with self._lock, self._connection:
+            for item in prepared:
+                self._write(item)
+        return {"processed": {"items": prepared}}
+
+    def update(self, updates: dict, key: str, *, expire_in=None, expire_at=None):
+        with self._lock, self._connection:
+            item = self._row(key)
+            if item is None:
+                raise Exception(f"Key '{key}' not found")
+
+            for field, value in updates.items():
+                *parents, leaf = field.split(".")
+                target = item
+                for part in parents:
+                    target = target.setdefault(part, {})
+                kind = type(value).__name__
+                if kind == "Trim":
+                    target.pop(leaf, None)
+                elif kind == "Increment":
+                    target[leaf] = target.get(leaf, 0) + value.val
+                elif kind == "Append":
+                    target[leaf] = list(target.get(leaf, [])) + value.val
+                elif kind == "Prepend":
+                    target[leaf] = value.val + list(target.get(leaf, []))
+                else:
+                    target[leaf] = value
+
+            expires = expiration(expire_in, expire_at)
+            if expires is not None:
+                item["__expires"] = expires
+            self._write(item)
+
+    def delete(self, key: str):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM items WHERE base = ? AND key = ?", (self.name, key)
+            )
+
+    def fetch(self, query=None, limit: int = 1000, last: Optional[str] = None, desc: bool = False) -> FetchResponse:
+        order = "DESC" if desc else "ASC"
+        cursor_filter = ("AND key < ?" if desc else "AND key > ?") if last else ""
+        params = [self.name, self._now()] + ([last] if last else [])
+
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT key, value FROM items WHERE base = ? AND (expires IS NULL OR expires > ?) "
+                f"{cursor_filter} ORDER BY key {order}",
+                params,
+            )
+            items, more = [], False
+            for _, value in rows:
+                item = json.loads(value)
+                if not matches(item, query):
+                    continue
+                if len(items) >= limit:
+                    more = True
+                    break
+                items.append(item)
+
+        return FetchResponse(
+            count=len(items), last=items[-1]["key"] if more else None, items=items
+        )
+
+
+class LocalStreamingBody:
+    """Streaming body of a `LocalDrive` file, like the `DriveStreamingBody` of the Deta SDK."""
+
+    def __init__(self, path: str, content_type: Optional[str] = None):
+        self._file = open(path, "rb")
+        self._headers = {
+            "content-length": str(os.path.getsize(path)),
+            "content-type": content_type,
+        }
+
+    def getheader(self, name: str, default=None):
+        return self._headers.get(name.lower()) or default
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def read(self, size: Optional[int] = None) -> bytes:
+        return self._file.read(-1 if size is None else size)
+
+    def iter_chunks(self, chunk_size: int = 1024):
+        return iter(lambda: self._file.read(chunk_size), b"")
+
+    def iter_lines(self, chunk_size: int = 1024):
+        pending = b""
+        for chunk in self.iter_chunks(chunk_size):
+            lines = (pending + chunk).splitlines(True)
+            pending = lines.pop() if lines and not lines[-1].endswith(b"\n") else b""
+            for line in lines:
+                yield line.rstrip(b"\r\n")
+        if pending:
+            yield pending
+
+    def close(self):
+        self._file.close()
+
+
+class LocalDrive:
+    """## Class LocalDrive
+    Filesystem-backed stand-in of a Deta SDK Drive, with the same methods: `list`, `get`,
+    `put`, `delete`, `delete_many` and the multipart upload calls.
+    """
+
+    def __init__(self, root: str, name: str):
+        self.name = name
+        self._files = os.path.join(root, name, "files")
+        self._types = os.path.join(root, name, "types")
+        self._uploads = os.path.join(root, name, "uploads")
+        for directory in (self._files, self._types, self._uploads):
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str, directory: Optional[str] = None) -> str:
+        if not name:
+            raise ValueError("No name provided")
+        return os.path.join(directory or self._files, quote(name, safe=""))
+
+    def _save(self, name: str, source, content_type: Optional[str]):
+        fd, tmp_path = tempfile.mkstemp(dir=self._uploads)
+        with os.fdopen(fd, "wb") as tmp:
+            shutil.copyfileobj(source, tmp)
+        os.replace(tmp_path, self._path(name))
+        type_path = self._path(name, self._types)
+        if content_type:
+            with open(type_path, "w") as type_file:
+                type_file.write(content_type)
+        elif os.path.exists(type_path):
+            os.remove(type_path)
+
+    def list(self, limit: int = 1000, prefix: Optional[str] = None, last: Optional[str] = None) -> dict:
+        names = sorted(unquote(filename) for filename in os.listdir(self._files))
+        names = [
+            name
+            for name in names
+            if (not prefix or name.startswith(prefix)) and (not last or name > last)
+        ]
+        page = names[:limit]
+        paging = {"size": len(page)}
+        if len(names) > limit:
+            paging["last"] = page[-1]
+        return {"names": page, "paging": paging}
+
+    def get(self, name: str) -> Optional[LocalStreamingBody]:
+        path = self._path(name)
+        if not os.path.exists(path):
+            return None
+        type_path = self._path(name, self._types)
+        content_type = None
+        if os.path.exists(type_path):
+            with open(type_path) as type_file:
+                content_type = type_file.read()
+        return LocalStreamingBody(path, content_type)
+
+    def put(self, name: str, data=None, *, path: Optional[str] = None, content_type: Optional[str] = None) -> str:
+        if (data is None) == (path is None):
+            raise ValueError("Please provide data or a path, but not both")
+
+        if path is not None:
+            with open(path, "rb") as source:
+                self._save(name, source, content_type)
+        elif isinstance(data, (str, bytes)):
+            self._save(name, io.BytesIO(data.encode() if isinstance(data, str) else data), content_type)
+        else:
+            self._save(name, _StreamSource(data), content_type)
+        return name
+
+    def delete(self, name: str) -> str:
+        for directory in (self._files, self._types):
+            try:
+                os.remove(self._path(name, directory))
+            except FileNotFoundError:
+                pass
+        return name
+
+    def delete_many(self, names: list) -> dict:
+        if len(names) > 1000:
+            raise AssertionError("More than 1000 names to delete")
+        return {"deleted": [self.delete(name) for name in names]}
+
+    def _start_upload(self, name: str) -> str:
+        upload_id = secrets.token_hex(8)
+        os.makedirs(os.path.join(self._uploads, upload_id))
+        return upload_id
+
+    def _upload_part(self, name: str, chunk: bytes, upload_id: str, part: int, content_type: Optional[str] = None):
+        with open(os.path.join(self._uploads, upload_id, f"{part:08d}"), "wb") as part_file:
+            part_file.write(chunk)
+        if content_type:
+            with open(os.path.join(self._uploads, upload_id, "type"), "w") as type_file:
+                type_file.write(content_type)
+
+    def _finish_upload(self, name: str, upload_id: str):
+        directory = os.path.join(self._uploads, upload_id)
+        parts = sorted(part for part in os.listdir(directory) if part.isdigit())
+        content_type = None
+        if os.path.exists(os.path.join(directory, "type")):
+            with open(os.path.join(directory, "type")) as type_file:
+                content_type = type_file.read()
+        self._save(name, _PartsSource(directory, parts), content_type)
+        shutil.rmtree(directory)
+
+    def _abort_upload(self, name: str, upload_id: str):
+        shutil.rmtree(os.path.join(self._uploads, upload_id), ignore_errors=True)
+
+
+class _StreamSource:
+    """Binary reader over a text or binary stream, for `shutil.copyfileobj`."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._stream.read(size)
+        return chunk.encode() if isinstance(chunk, str) else chunk
+
+
+class _PartsSource:
+    """Readable concatenation of the part files of a multipart upload."""
+
+    def __init__(self, directory: str, parts: list):
+        self._paths = [os.path.join(directory, part) for part in parts]
+        self._current = None
+
+    def read(self, size: int = -1) -> bytes:
+        while True:
+            if self._current is None:
+                if not self._paths:
+                    return b""
+                self._current = open(self._paths.pop(0), "rb")
+            chunk = self._current.read(size)
+            if chunk:
+                return chunk
+            self._current.close()
+            self._current = None
+
+
+class LocalDeta:
+    """## Class LocalDeta
+    In-process stand-in of the Deta client: `Base(name)` returns a `LocalBase` stored in
+    SQLite and `Drive(name)` a `LocalDrive` stored in the filesystem, both under `path`.
+    With `path=":memory:"` the Bases live in memory and the Drives in a temporary directory.
+    """
+
+    def __init__(self, path: str):
+        if path == ":memory:":
+            database = ":memory:"
+            self.drive_root = tempfile.mkdtemp(prefix="flask-deta-")
+        else:
+            os.makedirs(path, exist_ok=True)
+            database = os.path.join(path, "base.sqlite3")
+            self.drive_root = os.path.join(path, "drive")
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(database, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "base TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires INTEGER, "
+                "PRIMARY KEY (base, key))"
+            )
+
+    def Base(self, name: str, host: Optional[str] = None) -> LocalBase:
+        return LocalBase(self._connection, self._lock, name)
+
+    def Drive(self, name: str, host: Optional[str] = None) -> LocalDrive:
+        return LocalDrive(self.drive_root, name)
+
+
+def backend_from_config(app) -> Optional[LocalDeta]:
+    """Returns the local backend shared by every DetaBase and DetaDrive of an app, or None.
+
+    Enabled with `app.config['DETA_BACKEND'] = "local"`; the data is stored under
+    `app.config['DETA_LOCAL_PATH']` (by default `<instance_path>/deta`) and the backend
+    is kept in `app.extensions["flask_deta"]["backend"]`.
+    """
+
+    kind = app.config.get("DETA_BACKEND", "deta")
+    if kind == "deta":
+        return None
+    if kind != "local":
+        raise TypeError(f">>> ERROR in flask_deta ==> Unknown DETA_BACKEND '{kind}'")
+
+    if not hasattr(app, "extensions"):
+        app.extensions = {}
+    extension = app.extensions.setdefault("flask_deta", {})
+    if extension.get("backend") is None:
+        extension["backend"] = LocalDeta(
+            app.config.get("DETA_LOCAL_PATH", os.path.join(app.instance_path, "deta"))
+        )
+    return extension["backend"]
@@ -0,0 +1,365 @@
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from flask import Response, g, has_request_context
+from flask.signals import Namespace
+
+logger = logging.getLogger("flask_deta")
+
+_signals = Namespace()
+
+#: Sent after every instrumented DetaBase/DetaDrive call, with the extension as sender
+#: and the call details (see `Call.as_dict`) as the `call` keyword argument.
+deta_call_finished = _signals.signal("deta-call-finished")
+
+# Upper bounds, in seconds, of the call duration histogram buckets.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Call in progress in the current context; worker threads inherit it through `run_batches`.
+_current_call: ContextVar[Optional["Call"]] = ContextVar("flask_deta_call", default=None)
+
+
+class Call:
+    """Measurements of a single DetaBase/DetaDrive method call."""
+
+    def __init__(self, kind: str, name: str, method: str, parent: Optional["Call"] = None):
+        self.kind = kind
+        self.name = name
+        self.method = method
+        self.parent = parent
+        self.duration = 0.0
+        self.round_trips = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.result_size = None
+        self.error = None
+        self.cause = None
+        self._lock = threading.Lock()
+
+    def add_request(self, bytes_out: int, bytes_in: int):
+        call = self
+        while call is not None:
+            with call._lock:
+                call.round_trips += 1
+                call.bytes_out += bytes_out
+                call.bytes_in += bytes_in
+            call = call.parent
+
+    def fail(self, error: BaseException):
+        self.error = type(error).__name__
+        cause = error.__cause__ or error.__context__
+        self.cause = type(cause).__name__ if cause is not None else None
+
+    def as_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "method": self.method,
+            "duration": self.duration,
+            "round_trips": self.round_trips,
+            "bytes_out": self.bytes_out,
+            "bytes_in": self.bytes_in,
+            "result_size": self.result_size,
+            "error": self.error,
+            "cause": self.cause,
+        }
+
+
+def _size(payload) -> int:
+    """Approximate size in bytes of a request or response body of the Deta SDK."""
+
+    if payload is None:
+        return 0
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+        return len(payload)
+    if isinstance(payload, str):
+        return len(payload.encode())
+    if isinstance(payload, (dict, list)):
+        return len(json.dumps(payload))
+    length = getattr(payload, "getheader", lambda name: None)("Content-Length")
+    return int(length) if length else 0
+
+
+def _escape(value) -> str:
+    """Escapes a Prometheus label value."""
+
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _result_size(result) -> Optional[int]:
+    if isinstance(result, (list, tuple, set, dict, bytes, str)):
+        return len(result)
+    return None
+
+
+class DetaMetrics:
+    """## Class DetaMetrics
+    Aggregates the calls of every DetaBase and DetaDrive of an app: counts, errors, duration
+    histograms, round trips and bytes, by kind ("base"/"drive"), name and method.
+
+    ### Attributes:
+        * `slow_call (float | None)`: Calls slower than this, in seconds, are logged as warnings.
+    """
+
+    def __init__(self, slow_call: Optional[float] = None):
+        self.slow_call = slow_call
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._series = {}
+
+    def attach(self, instance):
+        """Counts the requests sent by a Deta SDK Base or Drive instance (round trips and bytes)."""
+
+        send = getattr(instance, "_request", None)
+        if send is None:  # Local backend, no HTTP requests.
+            return instance
+
+        @functools.wraps(send)
+        def request(path, method, data=None, *args, **kwargs):
+            status, payload = send(path, method, data, *args, **kwargs)
+            call = _current_call.get()
+            if call is not None:
+                call.add_request(_size(data), _size(payload))
+            return status, payload
+
+        instance._request = request
+        return instance
+
+    def record(self, sender, call: Call):
+        """Adds a finished call to the aggregates, the request summary and the signal receivers."""
+
+        labels = (call.kind, call.name, call.method)
+        with self._lock:
+            error_key = labels + (call.error or "", call.cause or "")
+            self._calls[error_key] = self._calls.get(error_key, 0) + 1
+
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {
+                    "buckets": [0] * len(DURATION_BUCKETS),
+                    "count": 0,
+                    "duration": 0.0,
+                    "round_trips": 0,
+                    "bytes_out": 0,
+                    "bytes_in": 0,
+                    "result_size": 0,
+                }
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if call.duration <= bound:
+                    series["buckets"][index] += 1
+            series["count"] += 1
+            series["duration"] += call.duration
+            series["round_trips"] += call.round_trips
+            series["bytes_out"] += call.bytes_out
+            series["bytes_in"] += call.bytes_in
+            series["result_size"] += call.result_size or 0
+
+        if has_request_context():
+            g.setdefault("_flask_deta_calls", []).append(call)
+
+        if self.slow_call is not None and call.duration >= self.slow_call:
+            logger.warning(
+                f"Slow Deta call {call.kind}:{call.name}.{call.method}() took {call.duration:.3f}s "
+                f"({call.round_trips} round trips, {call.bytes_out + call.bytes_in} bytes)"
+            )
+
+        deta_call_finished.send(sender, call=call.as_dict())
+
+    def snapshot(self) -> dict:
+        """Returns the aggregates as a dict keyed by `"kind:name.method"`."""
+
+        with self._lock:
+            result = {}
+            for (kind, name, method), series in self._series.items():
+                entry = dict(series, buckets=dict(zip(DURATION_BUCKETS, series["buckets"])), errors={})
+                result[f"{kind}:{name}.{method}"] = entry
+            for (kind, name, method, error, cause), count in self._calls.items():
+                if error:
+                    errors = result[f"{kind}:{name}.{method}"]["errors"]
+                    errors[error] = errors.get(error, 0) + count
+            return result
+
+    def render(self) -> str:
+        """Returns the aggregates in the Prometheus text exposition format."""
+
+        def label(kind, name, method, **extra):
+            pairs = {"kind": kind, "name": name, "method": method, **extra}
+            return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs.items()) + "}"
+
+        with self._lock:
+            calls = dict(self._calls)
+            series = {labels: dict(values, buckets=list(values["buckets"])) for labels, values in self._series.items()}
+
+        lines = [
+            "# HELP flask_deta_calls_total DetaBase/DetaDrive method calls, by error and underlying cause class.",
+            "# TYPE flask_deta_calls_total counter",
+        ]
+        for (kind, name, method, error, cause), count in calls.items():
+            lines.append(f"flask_deta_calls_total{label(kind, name, method, error=error, cause=cause)} {count}")
+
+        lines += [
+            "# HELP flask_deta_call_duration_seconds Duration of DetaBase/DetaDrive method calls.",
+            "# TYPE flask_deta_call_duration_seconds histogram",
+        ]
+        for labels, values in series.items():
+            for bound, count in zip(DURATION_BUCKETS, values["buckets"]):
+                lines.append(f"flask_deta_call_duration_seconds_bucket{label(*labels, le=bound)} {count}")
+            lines.append(f"flask_deta_call_duration_seconds_bucket{label(*labels, le='+Inf')} {values['count']}")
+            lines.append(f"flask_deta_call_duration_seconds_sum{label(*labels)} {values['duration']}")
+            lines.append(f"flask_deta_call_duration_seconds_count{label(*labels)} {values['count']}")
+
+        for metric, key, help in (
+            ("flask_deta_round_trips_total", "round_trips", "HTTP requests sent to Deta."),
+            ("flask_deta_sent_bytes_total", "bytes_out", "Request body bytes sent to Deta."),
+            ("flask_deta_received_bytes_total", "bytes_in", "Response body bytes received from Deta."),
+            ("flask_deta_result_items_total", "result_size", "Items, names or bytes returned by the calls."),
+        ):
+            lines += [f"# HELP {metric} {help}", f"# TYPE {metric} counter"]
+            for labels, values in series.items():
+                lines.append(f"{metric}{label(*labels)} {values[key]}")
+
+        return "\n".join(lines) + "\n"
+
+
+def instrumented(method):
+    """Decorates a DetaBase/DetaDrive method to measure its calls when metrics are enabled.
+
+    Generator methods are measured until they are exhausted or closed; their duration only
+    counts the time spent producing items, and their result size is the number of items.
+    """
+
+    is_generator = inspect.isgeneratorfunction(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        metrics = self.metrics
+        if metrics is None:
+            return method(self, *args, **kwargs)
+
+        kind = type(self).__name__.removeprefix("Deta").lower()
+        call = Call(kind, self.name, method.__name__, _current_call.get())
+
+        if is_generator:
+            return _measure_generator(metrics, self, call, method(self, *args, **kwargs))
+
+        token = _current_call.set(call)
+        started = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        except Exception as e:
+            call.fail(e)
+            raise
+        else:
+            call.result_size = _result_size(result)
+            return result
+        finally:
+            call.duration = time.perf_counter() - started
+            _current_call.reset(token)
+            metrics.record(self, call)
+
+    return wrapper
+
+
+def _measure_generator(metrics, sender, call, generator):
+    count = 0
+    try:
+        while True:
+            token = _current_call.set(call)
+            started = time.perf_counter()
+            try:
+                item = next(generator)
+            except StopIteration:
+                return
+            except Exception as e:
+                call.fail(e)
+                raise
+            finally:
+                call.duration += time.perf_counter() - started
+                _current_call.reset(token)
+            count += 1
+            yield item
+    finally:
+        generator.close()
+        call.result_size = count
+        metrics.record(sender, call)
+
+
+def request_summary() -> dict:
+    """Returns a summary of the Deta calls made so far by the current request.
+
+    ### Returns:
+        A dict with the totals (`calls`, `duration`, `round_trips`, `bytes_out`, `bytes_in`,
+        `errors`) and the list of individual `details`, or empty totals outside a request.
+    """
+
+    calls = g.get("_flask_deta_calls", []) if has_request_context() else []
+    top_level = [call for call in calls if call.parent is None]
+    return {
+        "calls": len(calls),
+        "duration": sum(call.duration for call in top_level),
+        "round_trips": sum(call.round_trips for call in top_level),
+        "bytes_out": sum(call.bytes_out for call in top_level),
+        "bytes_in": sum(call.bytes_in for call in top_level),
+        "errors": sum(1 for call in calls if call.error),
+        "details": [call.as_dict() for call in calls],
+    }
+
+
+def _server_timing(response):
+    calls = g.get("_flask_deta_calls")
+    if not calls:
+        return response
+
+    totals = {}
+    for call in calls:
+        if call.parent is None:
+            key = f"deta-{call.kind}-{call.method}"
+            duration, count, round_trips = totals.get(key, (0.0, 0, 0))
+            totals[key] = (duration + call.duration, count + 1, round_trips + call.round_trips)
+
+    for key, (duration, count, round_trips) in totals.items():
+        response.headers.add(
+            "Server-Timing", f'{key};dur={duration * 1000:.1f};desc="{count} calls, {round_trips} round trips"'
+        )
+    return response
+
+
+def metrics_from_config(app) -> Optional[DetaMetrics]:
+    """Returns the metrics shared by every DetaBase and DetaDrive of an app, or None.
+
+    Enabled with `app.config['DETA_METRICS']`, or implicitly by `DETA_METRICS_ENDPOINT`, which
+    registers a Prometheus-format view at that URL. `DETA_METRICS_SERVER_TIMING` adds a
+    `Server-Timing` header summarizing the Deta calls of each response and
+    `DETA_METRICS_SLOW_CALL` logs the calls slower than that many seconds. The metrics
+    are kept in `app.extensions["flask_deta"]["metrics"]`.
+    """
+
+    endpoint = app.config.get("DETA_METRICS_ENDPOINT")
+    if not app.config.get("DETA_METRICS") and not endpoint:
+        return None
+
+    if not hasattr(app, "extensions"):
+        app.extensions = {}
+    extension = app.extensions.setdefault("flask_deta", {})
+    if extension.get("metrics") is not None:
+        return extension["metrics"]
+
+    metrics = DetaMetrics(slow_call=app.config.get("DETA_METRICS_SLOW_CALL"))
+
+    if endpoint:
+        app.add_url_rule(
+            endpoint,
+            "flask_deta_metrics",
+            lambda: Response(metrics.render(), mimetype="text/plain; version=0.0.4"),
+        )
+    if app.config.get("DETA_METRICS_SERVER_TIMING"):
+        app.after_request(_server_timing)
+
+    extension["metrics"] = metrics
+    return metrics
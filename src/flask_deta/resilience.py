@@ -0,0 +1,333 @@
+import contextvars
+import functools
+import http.client
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Optional
+from urllib.error import HTTPError
+
+logger = logging.getLogger("flask_deta")
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised without contacting Deta while the circuit breaker of a host is open."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a Deta request, retries included, exceeds its deadline."""
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether an error of a Deta request is worth retrying: 5xx, 429, timeouts and connection errors."""
+
+    if isinstance(error, (CircuitOpenError, DeadlineExceeded)):
+        return False
+    if isinstance(error, HTTPError):
+        return error.code >= 500 or error.code == 429
+    return isinstance(error, (OSError, http.client.HTTPException))
+
+
+def is_idempotent(method: str, path: str, data=None) -> bool:
+    """Whether a request of the Deta SDK can be safely sent twice.
+
+    Reads, `PUT` of Base items that all have a key, deletions, queries, Drive file uploads and
+    upload parts are idempotent; `PUT` of items without a key (each attempt would store them
+    under a new key), inserts, updates (which may increment or append) and the start or end
+    of multipart uploads are not.
+    """
+
+    if method == "PUT" and path == "/items":
+        items = data.get("items") if isinstance(data, dict) else None
+        return isinstance(items, list) and all(isinstance(item, dict) and item.get("key") for item in items)
+    if method in ("GET", "HEAD", "PUT", "DELETE"):
+        return True
+    if method == "POST":
+        return path == "/query" or path.startswith("/files?") or "/parts?" in path
+    return False
+
+
+def is_read(method: str, path: str) -> bool:
+    return method == "GET" or (method == "POST" and path == "/query")
+
+
+class CircuitBreaker:
+    """## Class CircuitBreaker
+    Fails fast after `threshold` consecutive transient failures, for `reset_timeout` seconds.
+
+    Then a single probe request is let through (half-open) while the other callers keep
+    failing fast: its success closes the circuit, its failure opens it again. A probe that
+    never reports back is replaced after another `reset_timeout`.
+    """
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_started = None
+        self._lock = threading.Lock()
+
+    def before(self, host: str):
+        with self._lock:
+            if self.state == "closed":
+                return
+            now = time.monotonic()
+            if self.state == "open" and now - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and (
+                self._probe_started is None or now - self._probe_started >= self.reset_timeout
+            ):
+                self._probe_started = now
+                return
+            raise CircuitOpenError(
+                f"Circuit open for '{host}' after {self.failures} consecutive failures"
+            )
+
+    def success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probe_started = None
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    logger.warning(f"Deta circuit breaker opened after {self.failures} failures")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probe_started = None
+
+
+class Resilience:
+    """## Class Resilience
+    Retries, hedged reads, deadlines and circuit breaking for the requests of Deta SDK
+    Base and Drive instances, shared by every DetaBase and DetaDrive of an app.
+
+    ### Attributes:
+        * `retries (int)`: Extra attempts of idempotent requests after a transient error
+            (5xx, 429, timeout or connection error), with exponential backoff and full jitter.
+
+        * `backoff (float)`: Base delay, in seconds, doubled after each attempt.
+
+        * `max_backoff (float)`: Maximum delay, in seconds, between two attempts.
+
+        * `hedge_after (float | None)`: Reads still pending after this many seconds are sent a
+            second time, and the first response wins. Requires a thread-safe transport.
+
+        * `deadline (float | None)`: Maximum time, in seconds, of a request, retries included.
+            With a thread-safe transport a pending attempt is abandoned at the deadline;
+            otherwise the deadline is only checked between attempts.
+
+        * `breaker_threshold (int | None)`: Consecutive transient failures of a host that open
+            its circuit breaker; then calls fail with `CircuitOpenError` for `breaker_reset` seconds.
+
+        * `concurrent (bool)`: Whether attempts may run on worker threads (shared transport).
+    """
+
+    def __init__(
+        self,
+        retries: int = 0,
+        backoff: float = 0.1,
+        max_backoff: float = 2.0,
+        hedge_after: Optional[float] = None,
+        deadline: Optional[float] = None,
+        breaker_threshold: Optional[int] = None,
+        breaker_reset: float = 30.0,
+        concurrent: bool = False,
+        max_workers: int = 32,
+    ):
+        if hedge_after is not None and not concurrent:
+            raise TypeError(
+                ">>> ERROR in flask_deta ==> DETA_HEDGE_AFTER requires a shared DETA_TRANSPORT"
+            )
+
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_after = hedge_after
+        self.deadline = deadline
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.concurrent = concurrent
+
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._max_workers = max_workers
+        self._stats = {"retries": 0, "hedges": 0, "hedges_won": 0, "deadlines": 0, "rejected": 0}
+
+    def attach(self, instance):
+        """Routes the requests of a Deta SDK Base or Drive instance through this layer."""
+
+        send = getattr(instance, "_request", None)
+        if send is None:  # Local backend, no HTTP requests.
+            return instance
+
+        instance._request = functools.partial(self.request, send, getattr(instance, "host", None))
+        return instance
+
+    def breaker(self, host) -> Optional[CircuitBreaker]:
+        """Returns the circuit breaker of a host, or None when circuit breaking is disabled."""
+
+        if not self.breaker_threshold:
+            return None
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+            return breaker
+
+    def stats(self) -> dict:
+        """Returns the retry, hedge, deadline and rejection counters, and the breaker states by host."""
+
+        with self._lock:
+            stats = dict(self._stats)
+            stats["breakers"] = {host: breaker.state for host, breaker in self._breakers.items()}
+        return stats
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def request(self, send, host, path, method, data=None, headers=None, content_type=None, stream=False):
+        """Sends a request through `send` (the SDK `_request`), with the same contract."""
+
+        breaker = self.breaker(host)
+        replayable = data is None or isinstance(data, (bytes, bytearray, str, dict, list))
+        attempts = 1 + (self.retries if replayable and is_idempotent(method, path, data) else 0)
+        started = time.monotonic()
+
+        for attempt in range(attempts):
+            if breaker is not None:
+                try:
+                    breaker.before(host)
+                except CircuitOpenError:
+                    self._count("rejected")
+                    raise
+
+            try:
+                result = self._attempt(send, path, method, data, headers, content_type, stream, started)
+            except Exception as e:
+                if breaker is not None:
+                    (breaker.failure if is_transient(e) else breaker.success)()
+                if not is_transient(e) or attempt + 1 >= attempts:
+                    raise
+
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+                if self.deadline is not None and time.monotonic() - started + delay >= self.deadline:
+                    raise
+                logger.info(f"Retrying Deta request {method} {path} after {type(e).__name__} ({attempt + 1}/{attempts - 1})")
+                self._count("retries")
+                time.sleep(delay)
+                continue
+
+            if breaker is not None:
+                breaker.success()
+            return result
+
+    def _attempt(self, send, path, method, data, headers, content_type, stream, started):
+        hedged = self.hedge_after is not None and is_read(method, path)
+        if not self.concurrent or (self.deadline is None and not hedged):
+            return send(path, method, data, headers, content_type, stream)
+
+        executor = self._get_executor()
+
+        def submit():
+            # Each attempt runs in a copy of the caller's context, e.g. for metrics.
+            return executor.submit(
+                contextvars.copy_context().run, send, path, method, data, headers, content_type, stream
+            )
+
+        def remaining():
+            return None if self.deadline is None else max(self.deadline - (time.monotonic() - started), 0)
+
+        first = submit()
+        futures = [first]
+        timeout = remaining()
+        if hedged and (timeout is None or timeout > self.hedge_after):
+            done, _ = wait(futures, timeout=self.hedge_after)
+            if not done:
+                self._count("hedges")
+                futures.append(submit())
+            timeout = remaining()
+
+        while True:
+            done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                self._count("deadlines")
+                for future in futures:
+                    future.add_done_callback(_discard)
+                raise DeadlineExceeded(f"Deta request {method} {path} exceeded its {self.deadline}s deadline")
+
+            for future in done:
+                futures.remove(future)
+            winner = next((future for future in done if future.exception() is None), None)
+            if winner is not None:
+                if winner is not first:
+                    self._count("hedges_won")
+                for other in futures + [future for future in done if future is not winner]:
+                    other.add_done_callback(_discard)
+                return winner.result()
+            if not futures:
+                raise next(iter(done)).exception()
+            timeout = remaining()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers, thread_name_prefix="flask-deta-resilience"
+                )
+            return self._executor
+
+
+def _discard(future):
+    """Closes the streamed body of an abandoned attempt, so its connection is released."""
+
+    if future.cancelled() or future.exception() is not None:
+        return
+    _, payload = future.result()
+    close = getattr(payload, "close", None)
+    if close is not None:
+        close()
+
+
+def resilience_from_config(app, transport=None) -> Optional[Resilience]:
+    """Returns the resilience layer shared by every DetaBase and DetaDrive of an app, or None.
+
+    Built on first use from the `DETA_RETRIES`, `DETA_RETRY_BACKOFF`, `DETA_RETRY_MAX_BACKOFF`,
+    `DETA_HEDGE_AFTER`, `DETA_DEADLINE`, `DETA_BREAKER_THRESHOLD` and `DETA_BREAKER_RESET` keys
+    and stored in `app.extensions["flask_deta"]["resilience"]`.
+    """
+
+    config = app.config
+    if not any(
+        config.get(key)
+        for key in ("DETA_RETRIES", "DETA_HEDGE_AFTER", "DETA_DEADLINE", "DETA_BREAKER_THRESHOLD")
+    ):
+        return None
+
+    if not hasattr(app, "extensions"):
+        app.extensions = {}
+    extension = app.extensions.setdefault("flask_deta", {})
+    if extension.get("resilience") is not None:
+        return extension["resilience"]
+
+    resilience = Resilience(
+        retries=config.get("DETA_RETRIES", 0),
+        backoff=config.get("DETA_RETRY_BACKOFF", 0.1),
+        max_backoff=config.get("DETA_RETRY_MAX_BACKOFF", 2.0),
+        hedge_after=config.get("DETA_HEDGE_AFTER"),
+        deadline=config.get("DETA_DEADLINE"),
+        breaker_threshold=config.get("DETA_BREAKER_THRESHOLD"),
+        breaker_reset=config.get("DETA_BREAKER_RESET", 30.0),
+        concurrent=transport is not None,
+    )
+    extension["resilience"] = resilience
+    return resilience
@@ -0,0 +1,98 @@
+import json
+from typing import Iterable, Iterator, Optional
+from urllib.parse import urlencode
+
+from flask import current_app, has_request_context, request, stream_with_context
+
+JSON_MIMETYPE = "application/json"
+NDJSON_MIMETYPE = "application/x-ndjson"
+FORMATS = {"json": JSON_MIMETYPE, "ndjson": NDJSON_MIMETYPE}
+
+
+def _dumps(record) -> str:
+    return json.dumps(record, separators=(",", ":"), ensure_ascii=False)
+
+
+def _buffered(pieces: Iterable[str], size: int) -> Iterator[str]:
+    """Joins small pieces of text into chunks of about `size` characters."""
+
+    buffer, length = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def iter_json_array(records: Iterable, chunk_size: int = 64 * 1024) -> Iterator[str]:
+    """Serializes records as a JSON array, lazily, in chunks of about `chunk_size` characters."""
+
+    def pieces():
+        yield "["
+        separator = ""
+        for record in records:
+            yield separator
+            yield _dumps(record)
+            separator = ","
+        yield "]\n"
+
+    return _buffered(pieces(), chunk_size)
+
+
+def iter_ndjson(records: Iterable, chunk_size: int = 64 * 1024) -> Iterator[str]:
+    """Serializes records as NDJSON (one JSON document per line), lazily, in chunks."""
+
+    return _buffered((_dumps(record) + "\n" for record in records), chunk_size)
+
+
+def negotiate_format(default: str = "json") -> str:
+    """Returns `"ndjson"` or `"json"` from the `Accept` header of the request, or `default`."""
+
+    if not has_request_context():
+        return default
+    # The default comes first, so it wins ties such as `*/*`.
+    names = [default] + [name for name in FORMATS if name != default]
+    best = request.accept_mimetypes.best_match([FORMATS[name] for name in names])
+    return next((name for name in names if FORMATS[name] == best), default)
+
+
+def next_link(cursor: str, param: str = "cursor") -> str:
+    """Returns the URL of the current request with its `param` query argument set to a cursor."""
+
+    args = [(key, value) for key, value in request.args.items(multi=True) if key != param]
+    args.append((param, cursor))
+    return f"{request.base_url}?{urlencode(args)}"
+
+
+def stream_records(
+    records: Iterable,
+    format: str = "json",
+    next_cursor: Optional[str] = None,
+    cursor_param: str = "cursor",
+    status: int = 200,
+    headers: Optional[dict] = None,
+    chunk_size: int = 64 * 1024,
+):
+    """Returns a Flask `Response` streaming records as a chunked JSON array or NDJSON.
+
+    The records are serialized while they are consumed, so neither the list nor the whole
+    body is ever built. With a `next_cursor`, the `Link: <...>; rel="next"` and `X-Next-Cursor`
+    headers point to the following page.
+    """
+
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format '{format}', expected one of {tuple(FORMATS)}")
+
+    body = (iter_ndjson if format == "ndjson" else iter_json_array)(records, chunk_size)
+    if has_request_context():
+        body = stream_with_context(body)
+
+    response = current_app.response_class(body, status=status, headers=headers, mimetype=FORMATS[format])
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+        if has_request_context():
+            response.headers["Link"] = f'<{next_link(next_cursor, cursor_param)}>; rel="next"'
+    return response
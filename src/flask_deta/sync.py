@@ -0,0 +1,110 @@
+import contextlib
+import gzip
+import hashlib
+import io
+import json
+import os
+from typing import Iterable, Iterator, Optional, Union
+
+# Name of the file, stored in the Drive next to the synced files, describing their contents.
+MANIFEST_NAME = ".flask-deta-manifest.json"
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Returns the SHA-256 hex digest of a file, read in chunks."""
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_directory(directory: str, prefix: str = "", exclude: Iterable[str] = ()) -> dict[str, dict]:
+    """Returns the files of a directory tree by Drive name (`prefix` + relative path with `/`),
+    with their local `path`, `size` and `sha256`. Names listed in `exclude` are skipped.
+    """
+
+    exclude = set(exclude)
+    files = {}
+    for root, dirs, names in os.walk(directory):
+        dirs.sort()
+        for filename in sorted(names):
+            path = os.path.join(root, filename)
+            name = prefix + os.path.relpath(path, directory).replace(os.sep, "/")
+            if name in exclude or not os.path.isfile(path):
+                continue
+            files[name] = {"path": path, "size": os.path.getsize(path), "sha256": hash_file(path)}
+    return files
+
+
+def plan_sync(local: dict, manifest: dict, delete: bool = True) -> tuple[list, list, list]:
+    """Compares scanned files with a manifest and returns the names to upload, to delete and unchanged."""
+
+    upload, unchanged = [], []
+    for name, entry in local.items():
+        remote = manifest.get(name)
+        if remote is not None and remote.get("sha256") == entry["sha256"]:
+            unchanged.append(name)
+        else:
+            upload.append(name)
+    removed = [name for name in manifest if name not in local] if delete else []
+    return upload, removed, unchanged
+
+
+@contextlib.contextmanager
+def open_ndjson(target: Union[str, os.PathLike, io.IOBase], mode: str):
+    """Opens an NDJSON file for text reading (`"r"`) or writing (`"w"`); `.gz` paths are gzipped.
+
+    File objects are used as they are (binary ones are wrapped) and left open.
+    """
+
+    if isinstance(target, (str, os.PathLike)):
+        opener = gzip.open if os.fspath(target).endswith(".gz") else open
+        with opener(target, f"{mode}t", encoding="utf-8") as file:
+            yield file
+    elif isinstance(target, io.TextIOBase):
+        yield target
+    else:
+        wrapper = io.TextIOWrapper(target, encoding="utf-8")
+        try:
+            yield wrapper
+        finally:
+            wrapper.flush()
+            wrapper.detach()
+
+
+def write_ndjson(records: Iterable[dict], file) -> int:
+    """Writes records as one compact JSON document per line, and returns how many were written."""
+
+    count = 0
+    for record in records:
+        file.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False))
+        file.write("\n")
+        count += 1
+    return count
+
+
+def read_ndjson(file) -> Iterator[dict]:
+    """Lazily yields the JSON documents of an NDJSON file, skipping blank lines."""
+
+    for number, line in enumerate(file, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON on line {number} => {e}")
+
+
+def load_manifest(data: Optional[bytes]) -> dict:
+    """Parses a manifest downloaded from the Drive; a missing manifest is empty."""
+
+    if not data:
+        return {}
+    return json.loads(data).get("files", {})
+
+
+def dump_manifest(files: dict) -> bytes:
+    return json.dumps({"version": 1, "files": files}, sort_keys=True, separators=(",", ":")).encode()
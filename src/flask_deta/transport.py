@@ -0,0 +1,416 @@
+import functools
+import http.client
+import json
+import queue
+import threading
+import time
+import weakref
+from typing import Optional
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+
+JSON_MIME = "application/json"
+
+# Statuses returned to the SDK; unlike the SDK itself, `206 Partial Content` of ranged downloads is accepted.
+_SUCCESS = (200, 201, 202, 206, 207)
+
+# Errors raised when a kept-alive connection was closed by the server while idle.
+_STALE_ERRORS = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+
+
+def _split_host(host: str) -> tuple[str, str, Optional[int]]:
+    """Splits `host` or `scheme://host:port` into its scheme, hostname and port."""
+
+    parts = urlsplit(host if "://" in host else f"https://{host}")
+    return parts.scheme, parts.hostname, parts.port
+
+
+class ConnectionPool:
+    """## Class ConnectionPool
+    Thread-safe pool of keep-alive HTTP(S) connections to a single host.
+
+    ### Attributes:
+        * `maxsize (int)`: Maximum number of connections open at once; callers wait
+            for a free one beyond that.
+
+        * `timeout (float)`: Socket timeout, in seconds, of each connection.
+
+        * `pool_timeout (float | None)`: Maximum time, in seconds, to wait for a free
+            connection before raising `TimeoutError`, 30 by default. None waits forever.
+    """
+
+    def __init__(self, host: str, maxsize: int = 10, timeout: float = 10.0, pool_timeout: Optional[float] = 30.0):
+        self.scheme, self.hostname, self.port = _split_host(host)
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.pool_timeout = pool_timeout
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(maxsize)
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "pool_wait_seconds": 0.0,
+            "pool_wait_max_seconds": 0.0,
+        }
+
+    def _count(self, name: str, value=1):
+        with self._lock:
+            self._stats[name] += value
+
+    def acquire(self) -> tuple[http.client.HTTPConnection, bool]:
+        """Returns an idle connection, or a new one, and whether it is being reused."""
+
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.pool_timeout):
+            raise TimeoutError(f"No free connection to '{self.hostname}' after {self.pool_timeout}s")
+        waited = time.perf_counter() - started
+
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["pool_wait_seconds"] += waited
+            self._stats["pool_wait_max_seconds"] = max(self._stats["pool_wait_max_seconds"], waited)
+
+        try:
+            connection = self._idle.get_nowait()
+            self._count("connections_reused")
+            return connection, True
+        except queue.Empty:
+            pass
+
+        connection_class = (
+            http.client.HTTPConnection if self.scheme == "http" else http.client.HTTPSConnection
+        )
+        self._count("connections_created")
+        return connection_class(self.hostname, self.port, timeout=self.timeout), False
+
+    def release(self, connection: http.client.HTTPConnection, reusable: bool = True):
+        """Gives a connection back to the pool, closing it when it can not be reused."""
+
+        if reusable:
+            self._idle.put(connection)
+        else:
+            connection.close()
+        self._slots.release()
+
+    def stats(self) -> dict:
+        """Returns the request, connection reuse and pool wait counters."""
+
+        with self._lock:
+            stats = dict(self._stats)
+        stats["idle"] = self._idle.qsize()
+        stats["maxsize"] = self.maxsize
+        return stats
+
+
+class _PooledResponse:
+    """Streamed response that gives its connection back to the pool once read or closed.
+
+    A body dropped before being fully read or closed has its connection closed and its
+    slot released when it is garbage collected, so it can not exhaust the pool.
+    """
+
+    def __init__(self, response, connection, pool):
+        self._response = response
+        self._connection = connection
+        self._pool = pool
+        self.status = response.status
+        self.headers = response.headers
+        self._finalizer = weakref.finalize(self, pool.release, connection, False)
+
+    def getheader(self, name, default=None):
+        return self._response.getheader(name, default)
+
+    def _release(self, reusable: bool):
+        if self._connection is not None:
+            self._finalizer.detach()
+            self._pool.release(self._connection, reusable and not self._response.will_close)
+            self._connection = None
+
+    def read(self, amt=None) -> bytes:
+        data = self._response.read(amt)
+        if self._response.isclosed():
+            self._release(reusable=True)
+        return data
+
+    @property
+    def closed(self) -> bool:
+        return self._connection is None
+
+    def close(self):
+        # A partially read body leaves the connection in an unknown state.
+        self._release(reusable=self._response.isclosed())
+        self._response.close()
+
+
+class HTTPTransport:
+    """## Class HTTPTransport
+    Keep-alive transport shared by DetaBase and DetaDrive, with one `ConnectionPool` per host.
+
+    Attached instances send every request of the Deta SDK through the pools, which makes
+    them safe to share between threads.
+
+    ### Attributes:
+        * `maxsize (int)`: Maximum number of connections per host and worker process.
+
+        * `timeout (float)`: Socket timeout, in seconds.
+
+        * `pool_timeout (float | None)`: Maximum wait, in seconds, for a free connection.
+    """
+
+    def __init__(self, maxsize: int = 10, timeout: float = 10.0, pool_timeout: Optional[float] = 30.0):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.pool_timeout = pool_timeout
+
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def pool(self, host: str) -> ConnectionPool:
+        """Returns the connection pool of a host, creating it on first use."""
+
+        with self._lock:
+            pool = self._pools.get(host)
+            if pool is None:
+                pool = self._pools[host] = ConnectionPool(
+                    host, self.maxsize, self.timeout, self.pool_timeout
+                )
+            return pool
+
+    def attach(self, instance):
+        """Routes the requests of a Deta SDK Base or Drive instance through this transport."""
+
+        instance._request = functools.partial(self.request, instance)
+        return instance
+
+    def request(self, service, path, method, data=None, headers=None, content_type=None, stream=False):
+        """Sends a request on behalf of a Deta SDK service, with the same contract as its `_request`."""
+
+        url = service.base_path + path
+        headers = dict(headers or {})
+        headers["X-Api-Key"] = service.project_key
+        if content_type:
+            headers["Content-Type"] = content_type
+        body = json.dumps(data) if content_type == JSON_MIME else data
+
+        pool = self.pool(service.host)
+        while True:
+            connection, reused = pool.acquire()
+            try:
+                connection.request(method, url, body=body, headers=headers)
+                response = connection.getresponse()
+                break
+            except _STALE_ERRORS:
+                pool.release(connection, reusable=False)
+                if not reused:
+                    raise
+            except BaseException:
+                pool.release(connection, reusable=False)
+                raise
+
+        status = response.status
+        if status not in _SUCCESS:
+            response.read()
+            pool.release(connection, reusable=not response.will_close)
+            if status == 404:
+                return status, None
+            raise HTTPError(url, status, response.reason, response.headers, None)
+
+        if stream:
+            return status, _PooledResponse(response, connection, pool)
+
+        try:
+            payload = response.read()
+        except BaseException:
+            pool.release(connection, reusable=False)
+            raise
+        pool.release(connection, reusable=not response.will_close)
+
+        if JSON_MIME in (response.getheader("content-type") or ""):
+            payload = json.loads(payload)
+        return status, payload
+
+    def stats(self) -> dict:
+        """Returns the counters of every pool, by host."""
+
+        with self._lock:
+            pools = dict(self._pools)
+        return {host: pool.stats() for host, pool in pools.items()}
+
+
+class _HTTPXResponse:
+    """Streamed httpx response exposing the file-like interface used by the Deta SDK."""
+
+    def __init__(self, response):
+        self._response = response
+        self._chunks = response.iter_raw()
+        self._buffer = b""
+        self.status = response.status_code
+        self.headers = response.headers
+        # Gives the connection back to the httpx pool if the body is dropped unclosed.
+        weakref.finalize(self, response.close)
+
+    def getheader(self, name, default=None):
+        return self._response.headers.get(name, default)
+
+    def read(self, amt=None) -> bytes:
+        while amt is None or len(self._buffer) < amt:
+            chunk = next(self._chunks, b"")
+            if not chunk:
+                break
+            self._buffer += chunk
+        if amt is None:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+    @property
+    def closed(self) -> bool:
+        return self._response.is_closed
+
+    def close(self):
+        self._response.close()
+
+
+class HTTPXTransport:
+    """## Class HTTPXTransport
+    Transport built on an `httpx.Client`, which supports HTTP/2 when the `h2` package is
+    installed (`pip install httpx[http2]`). Same interface as `HTTPTransport`.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10,
+        timeout: float = 10.0,
+        pool_timeout: Optional[float] = 30.0,
+        http2: bool = True,
+    ):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError(
+                "The HTTP/2 transport requires httpx. Install it with: pip install httpx[http2]"
+            )
+
+        self.client = httpx.Client(
+            http2=http2,
+            timeout=httpx.Timeout(timeout, pool=pool_timeout),
+            limits=httpx.Limits(max_connections=maxsize, max_keepalive_connections=maxsize),
+        )
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def attach(self, instance):
+        """Routes the requests of a Deta SDK Base or Drive instance through this transport."""
+
+        instance._request = functools.partial(self.request, instance)
+        return instance
+
+    def request(self, service, path, method, data=None, headers=None, content_type=None, stream=False):
+        """Sends a request on behalf of a Deta SDK service, with the same contract as its `_request`."""
+
+        scheme, hostname, port = _split_host(service.host)
+        url = f"{scheme}://{hostname}{f':{port}' if port else ''}{service.base_path}{path}"
+        headers = dict(headers or {})
+        headers["X-Api-Key"] = service.project_key
+        if content_type:
+            headers["Content-Type"] = content_type
+        body = json.dumps(data) if content_type == JSON_MIME else data
+
+        # httpx has no pool events: the wait ends when the request gets a connection, i.e. when
+        # one is opened or its headers are sent, and a request that opens none reuses one.
+        started = time.perf_counter()
+        trace = {"waited": None, "created": False}
+
+        def on_event(name, info):
+            if trace["waited"] is None and name.endswith(("connect_tcp.started", "send_request_headers.started")):
+                trace["waited"] = time.perf_counter() - started
+            if name == "connection.connect_tcp.started":
+                trace["created"] = True
+
+        request = self.client.build_request(
+            method, url, content=body, headers=headers, extensions={"trace": on_event}
+        )
+        response = self.client.send(request, stream=True)
+
+        waited = trace["waited"] or 0.0
+        with self._lock:
+            host_stats = self._stats.setdefault(
+                service.host,
+                {
+                    "requests": 0,
+                    "connections_created": 0,
+                    "connections_reused": 0,
+                    "pool_wait_seconds": 0.0,
+                    "pool_wait_max_seconds": 0.0,
+                },
+            )
+            host_stats["requests"] += 1
+            host_stats["connections_created" if trace["created"] else "connections_reused"] += 1
+            host_stats["pool_wait_seconds"] += waited
+            host_stats["pool_wait_max_seconds"] = max(host_stats["pool_wait_max_seconds"], waited)
+            host_stats[response.http_version] = host_stats.get(response.http_version, 0) + 1
+
+        status = response.status_code
+        if status not in _SUCCESS:
+            response.read()
+            response.close()
+            if status == 404:
+                return status, None
+            raise HTTPError(url, status, response.reason_phrase, response.headers, None)
+
+        if stream:
+            return status, _HTTPXResponse(response)
+
+        try:
+            payload = response.read()
+        finally:
+            response.close()
+        if JSON_MIME in response.headers.get("content-type", ""):
+            payload = json.loads(payload)
+        return status, payload
+
+    def stats(self) -> dict:
+        """Returns the request, connection reuse and pool wait counters, and the requests
+        by HTTP version, by host.
+        """
+
+        with self._lock:
+            return {host: dict(stats) for host, stats in self._stats.items()}
+
+
+def transport_from_config(app):
+    """Returns the transport shared by every DetaBase and DetaDrive of an app, or None.
+
+    The transport is created on first use from the `DETA_TRANSPORT`, `DETA_POOL_MAXSIZE`,
+    `DETA_POOL_TIMEOUT` and `DETA_HTTP_TIMEOUT` keys and stored in
+    `app.extensions["flask_deta"]["transport"]`.
+    """
+
+    kind = app.config.get("DETA_TRANSPORT")
+    if not kind:
+        return None
+
+    if not hasattr(app, "extensions"):
+        app.extensions = {}
+    extension = app.extensions.setdefault("flask_deta", {})
+    if extension.get("transport") is not None:
+        return extension["transport"]
+
+    options = {
+        "maxsize": app.config.get("DETA_POOL_MAXSIZE", 10),
+        "timeout": app.config.get("DETA_HTTP_TIMEOUT", 10.0),
+        "pool_timeout": app.config.get("DETA_POOL_TIMEOUT", 30.0),
+    }
+    if kind == "pooled":
+        transport = HTTPTransport(**options)
+    elif kind == "http2":
+        transport = HTTPXTransport(**options)
+    else:
+        raise TypeError(f">>> ERROR in flask_deta ==> Unknown DETA_TRANSPORT '{kind}'")
+
+    extension["transport"] = transport
+    return transport
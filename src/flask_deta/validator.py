@@ -1,60 +1,107 @@
+import threading
+
 from deta import Deta
 from urllib.error import HTTPError
 
+# One Deta client per project key, shared by every DetaBase and DetaDrive.
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(key):
+    """Returns the shared Deta client of a project key, creating it on first use."""
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = Deta(key)
+        return client
+
+
+def build_instance(key, name, host, type, transport=None, client=None, metrics=None, resilience=None):
+    """Builds a DetaSpace Base or Drive instance without contacting the service.
+
+    Without a `transport`, instances wrap a single HTTP connection and must not be shared
+    between threads; call this again to get one for each worker thread. Instances attached
+    to a transport send their requests through its connection pools and are thread-safe.
+
+    A `client` (such as the local backend) replaces the shared Deta client of the key,
+    `metrics` count the round trips and bytes of the instance requests, and `resilience`
+    adds retries, hedging, deadlines and circuit breaking on top of them.
+    """
+
+    if client is not None:
+        return getattr(client, type)(name, host)
+
+    instance = getattr(get_client(key), type)(name, host)
+    if transport is not None:
+        transport.attach(instance)
+    if metrics is not None:
+        metrics.attach(instance)
+    if resilience is not None:
+        resilience.attach(instance)
+    return instance
+
+
+def _setup_error(error, type):
+    """Translates a setup or connection error into the exceptions raised by `verify_setups`."""
+
+    error_msg = f">>> ERROR in Deta{type}"
+
+    if isinstance(error, KeyError):
+        return KeyError(f"{error_msg} ==> Bad key. {error}")
+
+    elif isinstance(error, HTTPError):
+        return KeyError(f"{error_msg} ==> Key does not exist. {error.msg}")
+
+    return TypeError(f"{error_msg} ==> {error}")
 
-def verify_setups(key, name, host, type):
+
+def check_connection(instance, type):
+    """Checks the connection of a DetaSpace Base or Drive instance.
+
+    Attempts an internal test by fetching one element, either from a "Base" or a "Drive"
+    depending on the specified Deta type. An empty Base or Drive is a valid connection.
+    """
+
+    try:
+        if type == "Base":
+            instance.fetch(limit=1)
+        else:
+            instance.list(limit=1)
+    except Exception as e:
+        raise _setup_error(e, type)
+
+
+def verify_setups(
+    key, name, host, type, lazy=False, transport=None, client=None, metrics=None, resilience=None
+):
     """Verifies the connection to DetaSpace Base or Drive.
 
     This method checks whether the provided project key and base name are correct, and
     attempts to establish a connection to the specified DetaSpace Base or Drive. If the connection
     is successful, it returns Base or Drive instance; otherwise, it returns Error.
-    """
 
-    error_msg = f">>> ERROR in Deta{type}"
+    With `lazy=True` the connection test is skipped, and left to `check_connection`.
+    With a `client` (such as the local backend) the project key is not required.
+    """
 
     try:
-        if not key:
+        if not key and client is None:
             raise KeyError("The project key has not been provided.")
-        
+
         if not name:
             raise ValueError(f"The {type} has not been provided")
-        
-        deta_instance = Deta(key)
+
         deta_type = type  # Base o Drive
-        full_instance = getattr(deta_instance, deta_type)(name, host)
-        
-        # Attempt an internal test to check the connection by fetching an element,
-        # either a "Base" or "Drive" depending on the specified Deta type.
-        connection = (
-            full_instance.fetch(limit=1).items 
-            if deta_type == "Base" 
-            else full_instance.list(limit=1)['names']
+        full_instance = build_instance(
+            key, name, host, deta_type, transport, client, metrics, resilience
         )
-        
-        if not connection:
-            raise ValueError(
-                f"Incorrect {type} Name => {type} '{name}' not found"
-            )
-        else:
-            connection = None
-        
-        return full_instance
-        
-    except (HTTPError, KeyError) as e:
-
-        if isinstance(e, KeyError):
-            raise KeyError(
-                f"{error_msg} ==> Bad key. {e}"
-            )
-        
-        elif isinstance(e, HTTPError):
-            raise KeyError(
-                f"{error_msg} ==> Key does not exist. {e.msg}"
-            )
-    
-    except (ValueError) as e:
-        raise TypeError(f"{error_msg} ==> {e}")
 
     except Exception as e:
-        raise TypeError(f"{error_msg} ==> {e}")
-    
\ No newline at end of file
+        raise _setup_error(e, type)
+
+    if not lazy:
+        check_connection(full_instance, deta_type)
+
+    return full_instance
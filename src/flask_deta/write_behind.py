@@ -0,0 +1,153 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger("flask_deta")
+
+DURABILITY_POLICIES = ("best_effort", "flush_on_exit", "flush_on_teardown")
+
+
+class WriteBehindBuffer:
+    """## Class WriteBehindBuffer
+    In-process queue of pending writes, flushed in batches by a background thread.
+
+    A batch is flushed when it reaches `batch_size` items or when `interval` seconds
+    have passed since its first item, whichever comes first.
+
+    ### Attributes:
+        * `flush_func (Callable[[list], None])`: Writes a batch; called from the background thread.
+
+        * `batch_size (int)`: Maximum number of items per batch.
+
+        * `interval (float)`: Maximum time, in seconds, an item waits in the buffer.
+
+        * `max_queue (int)`: Maximum number of pending items. Beyond it `enqueue` blocks
+            (backpressure) for up to `timeout` seconds, then raises `TypeError`.
+
+        * `durability (str)`: When pending items are flushed besides the background thread:
+            `"best_effort"` (never), `"flush_on_exit"` (at interpreter shutdown) or
+            `"flush_on_teardown"` (also at the end of every app context).
+
+        * `failed (list)`: Items of the batches that could not be written.
+    """
+
+    def __init__(
+        self,
+        flush_func: Callable[[list], None],
+        batch_size: int = 25,
+        interval: float = 1.0,
+        max_queue: int = 10000,
+        timeout: Optional[float] = 1.0,
+        durability: str = "flush_on_exit",
+    ):
+        if durability not in DURABILITY_POLICIES:
+            raise TypeError(
+                f"Unknown write-behind durability '{durability}', expected one of {DURABILITY_POLICIES}"
+            )
+
+        self.flush_func = flush_func
+        self.batch_size = batch_size
+        self.interval = interval
+        self.timeout = timeout
+        self.durability = durability
+        self.failed = []
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="flask-deta-write-behind", daemon=True
+        )
+        self._thread.start()
+
+        if durability != "best_effort":
+            atexit.register(self.close)
+
+    def enqueue(self, item):
+        """Queues an item to be written.
+
+        Raises `TypeError` if a previous batch failed to be written (once per failure),
+        or if the queue stays full for `timeout` seconds because flushing falls behind.
+        """
+
+        if self._closed:
+            raise TypeError("The write-behind buffer is closed")
+
+        error, self._error = self._error, None
+        if error is not None:
+            raise TypeError(f"A write-behind batch could not be written => {error}")
+
+        try:
+            self._queue.put(item, timeout=self.timeout)
+        except queue.Full:
+            raise TypeError(
+                f"The write-behind buffer is full ({self._queue.maxsize} pending items), flushing falls behind"
+            )
+
+    def flush(self):
+        """Blocks until every pending item has been written (or has failed)."""
+
+        self._queue.join()
+
+    def close(self):
+        """Flushes the pending items and stops the background thread."""
+
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+    def pending(self) -> int:
+        """Returns the approximate number of items waiting to be written."""
+
+        return self._queue.qsize()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                self.flush_func(batch)
+            except Exception as e:
+                logger.error(f"Error flushing a write-behind batch of {len(batch)} items => {e}")
+                self.failed.extend(batch)
+                self._error = e
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+def write_behind_from_config(config, prefix: str, flush_func) -> Optional[WriteBehindBuffer]:
+    """Builds a `WriteBehindBuffer` from `<prefix>_WRITE_BEHIND*` config keys, or None when it is disabled."""
+
+    if not config.get(f"{prefix}_WRITE_BEHIND"):
+        return None
+
+    return WriteBehindBuffer(
+        flush_func,
+        batch_size=config.get(f"{prefix}_WRITE_BEHIND_BATCH", 25),
+        interval=config.get(f"{prefix}_WRITE_BEHIND_INTERVAL", 1.0),
+        max_queue=config.get(f"{prefix}_WRITE_BEHIND_MAX_QUEUE", 10000),
+        timeout=config.get(f"{prefix}_WRITE_BEHIND_TIMEOUT", 1.0),
+        durability=config.get(f"{prefix}_WRITE_BEHIND_DURABILITY", "flush_on_exit"),
+    )